@@ -0,0 +1,138 @@
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, List, Callable
+
+from risk_analyzer import RiskAssessment
+
+def assessment_to_dict(assessment: RiskAssessment) -> Dict[str, Any]:
+    """JSON-friendly view of a RiskAssessment (shallow, metrics are flat)"""
+    return {
+        "risk_level": assessment.risk_level.value,
+        "recommended_action": assessment.recommended_action.value,
+        "health_factor": assessment.health_factor,
+        "distance_to_liquidation": assessment.distance_to_liquidation,
+        "correlation": assessment.correlation,
+        "price_decoupling_risk": assessment.price_decoupling_risk,
+        "net_apy": assessment.net_apy,
+        "gas_acceptable": assessment.gas_acceptable,
+        "is_profitable": assessment.is_profitable,
+        "reasons": list(assessment.reasons),
+        "metrics": dict(assessment.metrics)
+    }
+
+def assessment_key(assessment: RiskAssessment) -> tuple:
+    """Fields that decide whether a published assessment changed"""
+    metrics = assessment.metrics
+    return (
+        assessment.risk_level,
+        assessment.recommended_action,
+        assessment.health_factor,
+        assessment.distance_to_liquidation,
+        assessment.correlation,
+        assessment.price_decoupling_risk,
+        assessment.net_apy,
+        assessment.gas_acceptable,
+        metrics.get("loops"),
+        metrics.get("utilization"),
+        metrics.get("deferred_action")
+    )
+
+class AgentState:
+    """
+    Latest per-user assessments, alerts and correlation, versioned for deltas
+
+    Written by the monitoring loop and read by the API server. Every change
+    bumps a global version; readers pass the version they last saw to get
+    only what changed since.
+    """
+
+    def __init__(self, max_alerts: int = 500):
+        self._lock = threading.Lock()
+        self.version = 0
+        self.assessments: Dict[str, Dict[str, Any]] = {}
+        self.user_versions: Dict[str, int] = {}
+        self._assessment_keys: Dict[str, tuple] = {}
+        self.alerts: deque = deque(maxlen=max_alerts)  # (version, alert)
+        self.alerts_evicted_version = 0  # Version of the newest alert rotated out
+        self.correlation: Optional[Dict[str, Any]] = None
+        self.correlation_version = 0
+        self._listeners: List[Callable[[int], None]] = []
+
+    def subscribe(self, listener: Callable[[int], None]):
+        """Call `listener(version)` after every change (from the writer's thread)"""
+        self._listeners.append(listener)
+
+    def _changed(self) -> int:
+        self.version += 1
+        return self.version
+
+    def _notify(self, version: int):
+        for listener in self._listeners:
+            listener(version)
+
+    def publish_assessment(self, user_address: str, assessment: RiskAssessment, updated_at: str):
+        # Keys are only touched by the writer thread, compare before taking the lock
+        key = assessment_key(assessment)
+        if self._assessment_keys.get(user_address) == key:
+            return
+        data = assessment_to_dict(assessment)
+        with self._lock:
+            self._assessment_keys[user_address] = key
+            self.assessments[user_address] = {"assessment": data, "updated_at": updated_at}
+            self.user_versions[user_address] = version = self._changed()
+        self._notify(version)
+
+    def publish_alert(self, alert: Dict[str, Any]):
+        with self._lock:
+            version = self._changed()
+            if len(self.alerts) == self.alerts.maxlen:
+                self.alerts_evicted_version = self.alerts[0][0]
+            self.alerts.append((version, alert))
+        self._notify(version)
+
+    def publish_correlation(self, correlation_data: Dict[str, Any]):
+        if not correlation_data or not correlation_data.get("success"):
+            return
+        with self._lock:
+            self.correlation = {
+                "estimate": float(correlation_data["correlation"]["estimate"]),
+                "risk_level": correlation_data["risk"]["overallRiskLevel"],
+                "prices": correlation_data.get("prices", {})
+            }
+            self.correlation_version = version = self._changed()
+        self._notify(version)
+
+    def snapshot(self, since: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Full state, or only what changed after version `since`
+
+        A full snapshot is also returned when `since` predates alerts that
+        have already been rotated out, since a delta could not include them.
+        """
+
+        with self._lock:
+            if since is None or since > self.version or since < self.alerts_evicted_version:
+                users = dict(self.assessments)
+                alerts = [alert for _, alert in self.alerts]
+                correlation = self.correlation
+                full = True
+            else:
+                users = {
+                    user: self.assessments[user]
+                    for user, version in self.user_versions.items() if version > since
+                }
+                alerts = [alert for version, alert in self.alerts if version > since]
+                correlation = self.correlation if self.correlation_version > since else None
+                full = False
+
+            return {
+                "version": self.version,
+                "full": full,
+                "users": users,
+                "alerts": alerts,
+                "correlation": correlation
+            }
+
+    def user(self, user_address: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.assessments.get(user_address)
@@ -0,0 +1,169 @@
+import json
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Optional, Set, Tuple
+
+from aiohttp import web, WSMsgType
+
+from agent_state import AgentState
+
+logger = logging.getLogger(__name__)
+
+def _dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(data, default=str)
+
+class ApiServer:
+    """
+    Read-only HTTP/WebSocket API over the agent's in-memory state
+
+    Runs its own asyncio loop on a daemon thread so the synchronous
+    monitoring loop is unaffected. Nothing here queries the chain.
+
+    GET /api/state[?since=<version>]  full state or delta, ETag / If-None-Match
+    GET /api/users/{address}          latest assessment for one user
+    GET /api/alerts                   recent alerts
+    GET /ws                           full snapshot on connect, then pushed deltas
+    """
+
+    def __init__(self, state: AgentState, host: str, port: int, cors_origin: str = "*",
+                 push_interval_seconds: float = 1.0):
+        self.state = state
+        self.host = host
+        self.port = port
+        self.cors_origin = cors_origin
+        self.push_interval_seconds = push_interval_seconds
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._clients: Set[web.WebSocketResponse] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._start_error: Optional[BaseException] = None
+
+    def start(self, timeout_seconds: float = 10.0):
+        """Start serving on a background thread; raises if the server cannot bind"""
+
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, args=(ready,), name="api-server", daemon=True)
+        self._thread.start()
+        if not ready.wait(timeout_seconds):
+            raise RuntimeError(f"API server did not start within {timeout_seconds:.0f}s")
+        if self._start_error is not None:
+            raise RuntimeError(f"API server failed to start on {self.host}:{self.port}: {self._start_error}") \
+                from self._start_error
+
+        self.state.subscribe(self._on_state_change)
+        logger.info(f"API server listening on http://{self.host}:{self.port}")
+
+    def _serve(self, ready: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._changed = asyncio.Event()
+
+        runner = web.AppRunner(self._build_app())
+        try:
+            self._loop.run_until_complete(runner.setup())
+            self._loop.run_until_complete(web.TCPSite(runner, self.host, self.port).start())
+            # Port 0 binds an ephemeral port, report the real one
+            self.port = runner.addresses[0][1]
+        except Exception as e:
+            self._start_error = e
+            self._loop.run_until_complete(runner.cleanup())
+            self._loop.close()
+            return
+        finally:
+            ready.set()
+
+        self._loop.create_task(self._broadcast())
+        self._loop.run_forever()
+
+    def _on_state_change(self, version: int):
+        # Called from the monitoring thread
+        self._loop.call_soon_threadsafe(self._changed.set)
+
+    def _build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._cors])
+        app.router.add_get("/api/state", self._get_state)
+        app.router.add_get("/api/users/{address}", self._get_user)
+        app.router.add_get("/api/alerts", self._get_alerts)
+        app.router.add_get("/ws", self._websocket)
+        return app
+
+    @web.middleware
+    async def _cors(self, request: web.Request, handler):
+        response = await handler(request)
+        response.headers["Access-Control-Allow-Origin"] = self.cors_origin
+        return response
+
+    # ------------------------------------------------------------------
+    # HTTP
+
+    async def _get_state(self, request: web.Request) -> web.Response:
+        since = request.query.get("since")
+        try:
+            since = int(since) if since is not None else None
+        except ValueError:
+            raise web.HTTPBadRequest(text="since must be an integer version")
+
+        etag = f'"{self.state.version}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+
+        snapshot = self.state.snapshot(since)
+        return web.Response(
+            text=_dumps(snapshot),
+            content_type="application/json",
+            headers={"ETag": f'"{snapshot["version"]}"', "Cache-Control": "no-cache"}
+        )
+
+    async def _get_user(self, request: web.Request) -> web.Response:
+        user = self.state.user(request.match_info["address"])
+        if user is None:
+            raise web.HTTPNotFound(text="User not monitored")
+        return web.Response(text=_dumps(user), content_type="application/json")
+
+    async def _get_alerts(self, request: web.Request) -> web.Response:
+        snapshot = self.state.snapshot()
+        return web.Response(text=_dumps({"alerts": snapshot["alerts"]}), content_type="application/json")
+
+    # ------------------------------------------------------------------
+    # WebSocket
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+
+        snapshot = self.state.snapshot()
+        ws["version"] = snapshot["version"]
+        await ws.send_str(_dumps(snapshot))
+        self._clients.add(ws)
+
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self._clients.discard(ws)
+        return ws
+
+    async def _broadcast(self):
+        """Push deltas to WebSocket clients, coalescing changes within push_interval_seconds"""
+
+        while True:
+            await self._changed.wait()
+            await asyncio.sleep(self.push_interval_seconds)
+            self._changed.clear()
+
+            # Clients connected at the same version share one serialized delta
+            deltas: Dict[int, Tuple[int, str]] = {}
+            for ws in list(self._clients):
+                since = ws["version"]
+                if since not in deltas:
+                    snapshot = self.state.snapshot(since)
+                    deltas[since] = (snapshot["version"], _dumps(snapshot))
+                version, text = deltas[since]
+                try:
+                    await ws.send_str(text)
+                    ws["version"] = version
+                except ConnectionResetError:
+                    self._clients.discard(ws)
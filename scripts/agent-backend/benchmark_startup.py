@@ -0,0 +1,90 @@
+"""
+Startup-time benchmark for the monitoring agent
+
+Measures, in a fresh interpreter each run, how long it takes to import the
+agent and construct MonitoringAgent, and checks that heavy dependencies are
+not imported on the startup path. The executor is built in the background,
+so each run also waits for it. Exits non-zero if executor construction
+fails or the median exceeds the budget, so it can be used as a regression
+check.
+
+Usage: python benchmark_startup.py [--runs 5] [--budget-ms 500] [--executor hardhat]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Modules that must stay off the startup path
+LAZY_MODULES = ["openai"]
+
+CHILD = """
+import sys, time, json
+t0 = time.perf_counter()
+from config import AgentConfig
+from monitoring_agent import MonitoringAgent
+t1 = time.perf_counter()
+agent = MonitoringAgent(AgentConfig(executor_backend={backend!r}), ["0x0000000000000000000000000000000000000000"])
+t2 = time.perf_counter()
+loaded = [m for m in {lazy!r} if m in sys.modules]
+try:
+    agent._executor_future.result()
+    error = None
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+t3 = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (t1 - t0) * 1000,
+    "init_ms": (t2 - t1) * 1000,
+    "executor_ms": (t3 - t2) * 1000,
+    "loaded": loaded,
+    "error": error
+}}))
+"""
+
+def run_once(lazy_modules, backend):
+    here = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(lazy=lazy_modules, backend=backend)],
+        cwd=here,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agent cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=500.0)
+    parser.add_argument("--executor", default="hardhat", help="Executor backend to construct")
+    args = parser.parse_args()
+
+    results = [run_once(LAZY_MODULES, args.executor) for _ in range(args.runs)]
+    totals = [r["import_ms"] + r["init_ms"] for r in results]
+
+    median = statistics.median(totals)
+    print(f"Import: {statistics.median(r['import_ms'] for r in results):.1f} ms (median)")
+    print(f"Init:   {statistics.median(r['init_ms'] for r in results):.1f} ms (median)")
+    print(f"Total:  {median:.1f} ms (median of {args.runs}), budget {args.budget_ms:.0f} ms")
+    print(f"Executor ready after: {statistics.median(r['executor_ms'] for r in results):.1f} ms (median, background)")
+
+    failed = False
+    errors = sorted({r["error"] for r in results if r["error"]})
+    if errors:
+        print(f"FAIL: executor construction failed: {'; '.join(errors)}")
+        failed = True
+    loaded = sorted({m for r in results for m in r["loaded"]})
+    if loaded:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(loaded)}")
+        failed = True
+    if median > args.budget_ms:
+        print("FAIL: startup time over budget")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import os
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 class RiskStrategy(Enum):
     CONSERVATIVE = "conservative"
@@ -25,13 +25,58 @@ class AgentConfig:
     health_factor_deviation: float = 0.15  # Trigger if HF deviates by 15%
     correlation_threshold: float = 0.85  # Alert if correlation drops below this
     max_debt_utilization: float = 0.75  # Max 75% of available borrows used
+    sharp_price_move_threshold: float = 0.02  # stIP/IP move that reorders monitoring
+    price_shock_buffer: float = 0.1  # After a sharp move, check users liquidated by a further 10% drop first
+    sharp_correlation_drop: float = 0.05  # Correlation drop between checks that also reorders monitoring
     
     # Gas settings
     max_gas_price_gwei: float = 100.0  # Don't execute if gas too high
+    gas_window_size: int = 60  # Recent gas samples kept for forecasting
+    gas_ewma_alpha: float = 0.3
+    gas_poll_interval_seconds: int = 15  # Gas re-check interval while actions are deferred
+    max_deferral_seconds: int = 1800  # Force deferred actions through after 30 minutes
+    deferral_force_hf_decay: float = 0.1  # Force deferred actions if HF decays this much
     
     # Strategy
     risk_strategy: RiskStrategy = RiskStrategy.CONSERVATIVE
     
+    # Startup
+    fast_start: bool = True  # Check system status concurrently with the first sweep
+    
+    # History: per-tick risk metrics are stored here when set (requires numpy)
+    timeseries_dir: str = ""
+    timeseries_raw_retention_days: float = 7.0
+    
+    # Dashboard API (read-only, served from agent memory); 0 disables it (requires aiohttp)
+    # Local-only by default, set API_HOST=0.0.0.0 (and a CORS origin) to expose it
+    api_host: str = "127.0.0.1"
+    api_port: int = 0
+    api_cors_origin: str = "*"
+    
+    # Profiling: cProfile every Nth iteration into profile_dir (enabled by main.py --profile)
+    profile: bool = False
+    profile_dir: str = "profiles"
+    profile_every_n: int = 10
+    profile_top_n: int = 30
+    
+    # Keeper accounts: rebalances are spread across these signers when set
+    keeper_accounts: list[str] = field(default_factory=list)
+    min_keeper_balance: float = 0.5  # Alert and stop using a keeper below this many IP
+    
+    # Executor backend: "hardhat" for the real chain, "fake" for the in-process FakeChain
+    executor_backend: str = "hardhat"
+    fake_chain_seed: int = 0
+    
+    # RPC resilience
+    rpc_urls: list[str] = field(default_factory=list)  # Failover endpoints (fake backend only); empty = network default
+    rpc_call_timeout_seconds: float = 60.0
+    tx_timeout_seconds: float = 300.0
+    rpc_max_retries: int = 3
+    retry_base_delay_seconds: float = 1.0
+    retry_max_delay_seconds: float = 15.0
+    breaker_failure_threshold: int = 5
+    breaker_reset_seconds: float = 60.0
+    
     # Hardhat settings
     hardhat_dir: str = "/Users/ppwoork/contract-deployment"
     network: str = "story_mainnet"
@@ -48,10 +93,32 @@ class AgentConfig:
             min_health_factor=float(os.getenv("MIN_HEALTH_FACTOR", "1.5")),
             target_health_factor=float(os.getenv("TARGET_HEALTH_FACTOR", "1.7")),
             critical_health_factor=float(os.getenv("CRITICAL_HEALTH_FACTOR", "1.3")),
+            sharp_price_move_threshold=float(os.getenv("SHARP_PRICE_MOVE_THRESHOLD", "0.02")),
+            price_shock_buffer=float(os.getenv("PRICE_SHOCK_BUFFER", "0.1")),
+            sharp_correlation_drop=float(os.getenv("SHARP_CORRELATION_DROP", "0.05")),
             max_gas_price_gwei=float(os.getenv("MAX_GAS_PRICE_GWEI", "100.0")),
+            gas_poll_interval_seconds=int(os.getenv("GAS_POLL_INTERVAL", "15")),
+            max_deferral_seconds=int(os.getenv("MAX_DEFERRAL_SECONDS", "1800")),
+            deferral_force_hf_decay=float(os.getenv("DEFERRAL_FORCE_HF_DECAY", "0.1")),
             risk_strategy=strategy,
             hardhat_dir=os.getenv("HARDHAT_DIR", "/Users/ppwoork/contract-deployment"),
-            network=os.getenv("NETWORK", "story_mainnet")
+            network=os.getenv("NETWORK", "story_mainnet"),
+            executor_backend=os.getenv("EXECUTOR", "hardhat").lower(),
+            timeseries_dir=os.getenv("TIMESERIES_DIR", ""),
+            api_host=os.getenv("API_HOST", "127.0.0.1"),
+            api_port=int(os.getenv("API_PORT", "0")),
+            api_cors_origin=os.getenv("API_CORS_ORIGIN", "*"),
+            profile_dir=os.getenv("PROFILE_DIR", "profiles"),
+            profile_every_n=int(os.getenv("PROFILE_EVERY", "10")),
+            timeseries_raw_retention_days=float(os.getenv("TIMESERIES_RAW_RETENTION_DAYS", "7")),
+            fake_chain_seed=int(os.getenv("FAKE_CHAIN_SEED", "0")),
+            keeper_accounts=[a.strip() for a in os.getenv("KEEPER_ACCOUNTS", "").split(",") if a.strip()],
+            min_keeper_balance=float(os.getenv("MIN_KEEPER_BALANCE", "0.5")),
+            rpc_urls=[url.strip() for url in os.getenv("RPC_URLS", "").split(",") if url.strip()],
+            rpc_call_timeout_seconds=float(os.getenv("RPC_CALL_TIMEOUT", "60")),
+            tx_timeout_seconds=float(os.getenv("TX_TIMEOUT", "300")),
+            rpc_max_retries=int(os.getenv("RPC_MAX_RETRIES", "3")),
+            fast_start=os.getenv("FAST_START", "true").lower() in ("1", "true", "yes")
         )
     
     def get_strategy_params(self):
@@ -0,0 +1,83 @@
+import inspect
+from typing import Dict, Any, Optional, Protocol
+
+class Executor(Protocol):
+    """
+    Interface the agent uses to read and act on chain state
+
+    Every method returns a JSON-style dict with a "success" flag, in the
+    same shape as the Hardhat agent scripts print.
+
+    Backends may also define begin_iteration(iteration), which the agent
+    calls once at the start of every monitoring iteration.
+    """
+
+    def query_position(self, user_address: str) -> Dict[str, Any]: ...
+
+    def get_gas_price(self) -> Dict[str, Any]: ...
+
+    def check_system_status(self) -> Dict[str, Any]: ...
+
+    def calculate_correlation(self) -> Dict[str, Any]: ...
+
+    def execute_rebalance(
+        self,
+        action: str,
+        user_address: str,
+        loops: Optional[int] = None,
+        signer: Optional[str] = None
+    ) -> Dict[str, Any]: ...
+
+    def get_signer_balance(self, address: str) -> Dict[str, Any]: ...
+
+def supports_keepers(executor) -> bool:
+    """
+    True if the backend can send rebalances from a given signer and report signer balances
+
+    Executors that wrap others (ResilientExecutor) answer through their own
+    supports_keepers() method.
+    """
+
+    check = getattr(executor, "supports_keepers", None)
+    if check is not None:
+        return check()
+
+    if not callable(getattr(executor, "get_signer_balance", None)):
+        return False
+
+    parameters = inspect.signature(executor.execute_rebalance).parameters.values()
+    return any(p.name == "signer" or p.kind == p.VAR_KEYWORD for p in parameters)
+
+def create_executor(config) -> Executor:
+    """
+    Build the executor selected by config.executor_backend
+
+    One backend executor is created per configured RPC URL (or a single one
+    on the network default), wrapped in a ResilientExecutor for timeouts,
+    retries, circuit breaking and failover.
+    """
+
+    from resilient_executor import ResilientExecutor
+
+    urls = config.rpc_urls or [None]
+
+    if config.executor_backend == "hardhat":
+        # HardhatExecutor talks to the network configured in hardhat_dir and
+        # has no per-endpoint URL, so it cannot be given several RPC endpoints
+        if config.rpc_urls:
+            raise ValueError(
+                "RPC_URLS is not supported by the hardhat backend, configure the RPC "
+                "in the Hardhat network config instead (or use EXECUTOR=fake)"
+            )
+        from hardhat_interface.executor import HardhatExecutor
+        endpoints = [(config.network, HardhatExecutor(config.hardhat_dir, config.network))]
+
+    elif config.executor_backend == "fake":
+        from fake_chain import FakeChain, FakeExecutor
+        chain = FakeChain(seed=config.fake_chain_seed)
+        endpoints = [(url or "fake", FakeExecutor(chain)) for url in urls]
+
+    else:
+        raise ValueError(f"Unknown executor backend: {config.executor_backend}")
+
+    return ResilientExecutor(endpoints, config)
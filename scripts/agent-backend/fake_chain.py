@@ -0,0 +1,398 @@
+import math
+import time
+import random
+import zlib
+import logging
+import threading
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Protocol parameters used by the model (match risk_analyzer assumptions)
+LOOP_LTV = 0.44  # Each loop borrows this fraction of the previous loop's stake
+MAX_LTV = 0.70  # Unleash max borrow LTV for stIP
+LIQUIDATION_THRESHOLD = 0.65  # HF = collateral value * threshold / debt
+NO_DEBT_HEALTH_FACTOR = 1000.0
+REBALANCE_GAS = 250000
+DEFAULT_SIGNER = "0x0000000000000000000000000000000000000001"
+
+@dataclass
+class MarketStep:
+    """One step of a price scenario (prices in IP, gas in Gwei)"""
+    stip_price: float = 1.0
+    ip_price: float = 1.0
+    gas_gwei: float = 30.0
+
+class FakeChain:
+    """
+    In-process model of user positions, prices and gas
+
+    Positions are kept in parallel arrays indexed by user so that tens of
+    thousands of users cost a few bytes each. Collateral is in stIP, debt
+    in IP; health factors are derived from the current stIP/IP price.
+    """
+
+    def __init__(self, seed: int = 0, correlation_window: int = 30, auto_create_users: bool = True):
+        self.seed = seed
+        self.auto_create_users = auto_create_users
+
+        self.index: Dict[str, int] = {}
+        self.addresses: List[str] = []
+        self.initial = array("d")  # Initial IP deposited
+        self.collateral = array("d")  # stIP supplied
+        self.debt = array("d")  # IP borrowed
+        self.loops = array("b")
+
+        self.market = MarketStep()
+        self.price_history = deque([(self.market.stip_price, self.market.ip_price)], maxlen=correlation_window)
+        self.scenario: deque = deque()
+
+        self.block = 0
+        self.tx_count = 0
+        self.iteration = 0
+
+    # ------------------------------------------------------------------
+    # Setup
+
+    def add_user(self, address: str, initial_collateral: float, loops: int = 0) -> int:
+        """Open a looped position at the current price, returns the user index"""
+
+        price = self.market.stip_price / self.market.ip_price
+        leverage = sum(LOOP_LTV ** k for k in range(loops + 1))
+
+        idx = len(self.addresses)
+        self.index[address] = idx
+        self.addresses.append(address)
+        self.initial.append(initial_collateral)
+        self.collateral.append(initial_collateral * leverage / price)
+        self.debt.append(initial_collateral * (leverage - 1))
+        self.loops.append(loops)
+        return idx
+
+    def populate(self, count: int, max_loops: int = 3) -> List[str]:
+        """Add `count` users with seeded random positions, returns their addresses"""
+
+        rng = random.Random(self.seed)
+        added = []
+        for i in range(count):
+            address = f"0x{self.seed:08x}{i:032x}"
+            self.add_user(address, round(rng.uniform(0.1, 5.0), 4), rng.randint(0, max_loops))
+            added.append(address)
+        return added
+
+    def _ensure_user(self, address: str) -> Optional[int]:
+        idx = self.index.get(address)
+        if idx is None and self.auto_create_users:
+            # Deterministic position per address
+            rng = random.Random(zlib.crc32(address.lower().encode()) ^ self.seed)
+            idx = self.add_user(address, round(rng.uniform(0.1, 5.0), 4), rng.randint(0, 3))
+        return idx
+
+    # ------------------------------------------------------------------
+    # Market
+
+    def set_market(self, stip_price: Optional[float] = None, ip_price: Optional[float] = None,
+                   gas_gwei: Optional[float] = None):
+        if stip_price is not None:
+            self.market.stip_price = stip_price
+        if ip_price is not None:
+            self.market.ip_price = ip_price
+        if gas_gwei is not None:
+            self.market.gas_gwei = gas_gwei
+        self.price_history.append((self.market.stip_price, self.market.ip_price))
+        self.block += 1
+
+    def load_scenario(self, steps: Iterable[MarketStep]):
+        """Queue market steps, applied one per advance()"""
+        self.scenario.extend(steps)
+
+    def advance(self) -> bool:
+        """Apply the next scenario step, returns False when the scenario is exhausted"""
+
+        if not self.scenario:
+            return False
+        step = self.scenario.popleft()
+        self.set_market(step.stip_price, step.ip_price, step.gas_gwei)
+        return True
+
+    def advance_to(self, iteration: int) -> bool:
+        """
+        Apply one scenario step per monitoring iteration up to `iteration`
+
+        Repeated calls for the same iteration are no-ops, so several
+        executors sharing the chain still step it exactly once.
+        """
+
+        advanced = False
+        while self.iteration < iteration:
+            self.iteration += 1
+            advanced = self.advance() or advanced
+        return advanced
+
+    @staticmethod
+    def depeg_scenario(steps: int, drop: float, gas_gwei: float = 30.0, gas_spike: float = 0.0) -> List[MarketStep]:
+        """Linear stIP depeg by `drop` over `steps`, optionally with gas rising by `gas_spike`"""
+        return [
+            MarketStep(
+                stip_price=1.0 - drop * (i + 1) / steps,
+                ip_price=1.0,
+                gas_gwei=gas_gwei + gas_spike * (i + 1) / steps
+            )
+            for i in range(steps)
+        ]
+
+    @property
+    def price_ratio(self) -> float:
+        return self.market.stip_price / self.market.ip_price
+
+    def correlation(self) -> float:
+        """Pearson correlation of stIP and IP price returns over the window"""
+
+        history = list(self.price_history)
+        if len(history) < 3:
+            return 0.95
+
+        stip_returns = [b[0] / a[0] - 1 for a, b in zip(history, history[1:])]
+        ip_returns = [b[1] / a[1] - 1 for a, b in zip(history, history[1:])]
+
+        n = len(stip_returns)
+        mean_s = sum(stip_returns) / n
+        mean_i = sum(ip_returns) / n
+        cov = sum((s - mean_s) * (i - mean_i) for s, i in zip(stip_returns, ip_returns))
+        var_s = sum((s - mean_s) ** 2 for s in stip_returns)
+        var_i = sum((i - mean_i) ** 2 for i in ip_returns)
+
+        if var_s == 0 or var_i == 0:
+            # Flat series carry no signal; a moving stIP against flat IP is a decoupling
+            return 0.95 if var_s == var_i else 0.5
+        return cov / math.sqrt(var_s * var_i)
+
+    # ------------------------------------------------------------------
+    # Position math
+
+    def health_factor(self, idx: int) -> float:
+        debt = self.debt[idx]
+        if debt <= 0:
+            return NO_DEBT_HEALTH_FACTOR
+        return self.collateral[idx] * self.price_ratio * LIQUIDATION_THRESHOLD / debt
+
+    def liquidation_price(self, idx: int) -> float:
+        """stIP/IP price at which the health factor reaches 1"""
+        collateral = self.collateral[idx]
+        if self.debt[idx] <= 0 or collateral <= 0:
+            return 0.0
+        return self.debt[idx] / (collateral * LIQUIDATION_THRESHOLD)
+
+    def position(self, idx: int) -> Dict[str, Any]:
+        collateral = self.collateral[idx]
+        debt = self.debt[idx]
+        price = self.price_ratio
+        collateral_value = collateral * price
+        max_borrow = collateral_value * MAX_LTV
+        hf = self.health_factor(idx)
+        liquidation_price = self.liquidation_price(idx)
+        has_position = collateral > 0
+
+        return {
+            "success": True,
+            "position": {
+                "hasPosition": has_position,
+                "initialCollateral": f"{self.initial[idx]:.6f}",
+                "totalBorrowed": f"{debt:.6f}",
+                "totalStaked": f"{collateral:.6f}",
+                "loops": int(self.loops[idx]),
+                "healthFactor": f"{hf:.6f}",
+                "leverage": f"{collateral_value / self.initial[idx] if self.initial[idx] else 0:.4f}"
+            },
+            "unleash": {
+                "totalCollateral": f"{collateral_value:.6f}",
+                "totalDebt": f"{debt:.6f}",
+                "availableBorrows": f"{max(max_borrow - debt, 0.0):.6f}",
+                "healthFactor": f"{hf:.6f}"
+            },
+            "risk": {
+                "distanceToLiquidation": f"{(1 - liquidation_price / price) if liquidation_price else 1.0:.6f}",
+                "liquidationPrice": f"{liquidation_price:.6f}",
+                "utilizationRate": f"{(debt / max_borrow * 100) if max_borrow else 0.0:.4f}"
+            }
+        }
+
+    def remove_loop(self, idx: int, count: int = 1):
+        """Unwind the most recent loops: sell stIP for IP and repay"""
+
+        price = self.price_ratio
+        for _ in range(min(count, self.loops[idx])):
+            loops = self.loops[idx]
+            repay = min(self.initial[idx] * LOOP_LTV ** loops, self.debt[idx])
+            self.collateral[idx] -= repay / price
+            self.debt[idx] -= repay
+            self.loops[idx] = loops - 1
+
+    def unwind(self, idx: int):
+        """Repay all debt from collateral and withdraw the rest"""
+        self.collateral[idx] = 0.0
+        self.debt[idx] = 0.0
+        self.loops[idx] = 0
+
+    def next_tx_hash(self) -> str:
+        self.tx_count += 1
+        return f"0x{zlib.crc32(f'{self.seed}:{self.tx_count}'.encode()):08x}{self.tx_count:056x}"
+
+class FakeExecutor:
+    """Executor backed by a FakeChain; drop-in replacement for HardhatExecutor"""
+
+    def __init__(self, chain: FakeChain, signer_balance: float = 10.0, tx_latency_seconds: float = 0.0):
+        self.chain = chain
+        # Simulated confirmation time; one signer's transactions are serialized by nonce
+        self.tx_latency_seconds = tx_latency_seconds
+        self.default_signer_balance = signer_balance
+        self.signer_balances: Dict[str, float] = {}
+        self._signer_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def fund_signer(self, address: str, amount: float):
+        with self._lock:
+            self.signer_balances[address] = self.signer_balances.get(address, self.default_signer_balance) + amount
+
+    def get_signer_balance(self, address: str) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "address": address,
+            "balance": f"{self.signer_balances.get(address, self.default_signer_balance):.6f}"
+        }
+
+    def begin_iteration(self, iteration: int):
+        """Scenario clock, stepped by the agent rather than by any read"""
+        with self._lock:
+            self.chain.advance_to(iteration)
+
+    def query_position(self, user_address: str) -> Dict[str, Any]:
+        idx = self.chain._ensure_user(user_address)
+        if idx is None:
+            return {"success": False, "error": f"Unknown user {user_address}"}
+        return self.chain.position(idx)
+
+    def get_gas_price(self) -> Dict[str, Any]:
+        gwei = self.chain.market.gas_gwei
+        return {
+            "success": True,
+            "gasPrice": {"gwei": f"{gwei:.4f}", "wei": str(int(gwei * 1e9))}
+        }
+
+    def check_system_status(self) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "systemStatus": {"operational": True, "warnings": []},
+            "block": self.chain.block
+        }
+
+    def calculate_correlation(self) -> Dict[str, Any]:
+        corr = self.chain.correlation()
+        deviation = abs(1 - self.chain.price_ratio)
+        if corr < 0.85 or deviation > 0.05:
+            level = "high"
+        elif corr < 0.9 or deviation > 0.02:
+            level = "medium"
+        else:
+            level = "low"
+
+        return {
+            "success": True,
+            "correlation": {"estimate": f"{corr:.6f}"},
+            "prices": {
+                "stIP": f"{self.chain.market.stip_price:.6f}",
+                "wip": f"{self.chain.market.ip_price:.6f}"
+            },
+            "risk": {"overallRiskLevel": level}
+        }
+
+    def execute_rebalance(
+        self,
+        action: str,
+        user_address: str,
+        loops: Optional[int] = None,
+        signer: Optional[str] = None
+    ) -> Dict[str, Any]:
+        signer = signer or DEFAULT_SIGNER
+        with self._lock:
+            signer_lock = self._signer_locks.setdefault(signer, threading.Lock())
+
+        with signer_lock:
+            if self.tx_latency_seconds:
+                time.sleep(self.tx_latency_seconds)
+
+            with self._lock:
+                idx = self.chain.index.get(user_address)
+                if idx is None:
+                    return {"success": False, "error": f"Unknown user {user_address}"}
+
+                gas_cost = REBALANCE_GAS * self.chain.market.gas_gwei * 1e-9
+                balance = self.signer_balances.get(signer, self.default_signer_balance)
+                if balance < gas_cost:
+                    return {"success": False, "error": f"Insufficient funds for gas on {signer}"}
+
+                if action == "remove_loop":
+                    if self.chain.loops[idx] == 0:
+                        return {"success": False, "error": "No loops to remove"}
+                    self.chain.remove_loop(idx, loops or 1)
+                elif action == "emergency_unwind":
+                    self.chain.unwind(idx)
+                else:
+                    return {"success": False, "error": f"Unsupported action {action}"}
+
+                self.signer_balances[signer] = balance - gas_cost
+
+                return {
+                    "success": True,
+                    "txHash": self.chain.next_tx_hash(),
+                    "from": signer,
+                    "gasUsed": str(REBALANCE_GAS),
+                    "updatedPosition": {
+                        "healthFactor": f"{self.chain.health_factor(idx):.6f}",
+                        "remainingLoops": int(self.chain.loops[idx])
+                    }
+                }
+
+class FlakyExecutor:
+    """
+    Wraps an executor with injected latency, errors and hangs
+
+    Stand-in for a degraded RPC endpoint when exercising ResilientExecutor.
+    """
+
+    def __init__(self, inner, failure_rate: float = 0.0, hang_rate: float = 0.0,
+                 latency_seconds: float = 0.0, hang_seconds: float = 60.0, seed: int = 0):
+        self.inner = inner
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.latency_seconds = latency_seconds
+        self.hang_seconds = hang_seconds
+        self.rng = random.Random(seed)
+
+    def _degrade(self):
+        if self.latency_seconds:
+            time.sleep(self.rng.uniform(0.5, 1.5) * self.latency_seconds)
+        roll = self.rng.random()
+        if roll < self.hang_rate:
+            time.sleep(self.hang_seconds)
+        elif roll < self.hang_rate + self.failure_rate:
+            raise ConnectionError("Injected RPC failure")
+
+    def begin_iteration(self, iteration: int):
+        # The scenario clock is not an RPC call, never degrade it
+        begin_iteration = getattr(self.inner, "begin_iteration", None)
+        if begin_iteration is not None:
+            begin_iteration(iteration)
+
+    def __getattr__(self, name):
+        method = getattr(self.inner, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            self._degrade()
+            return method(*args, **kwargs)
+        return call
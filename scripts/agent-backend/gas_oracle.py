@@ -0,0 +1,198 @@
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Any, Optional, List
+
+from risk_analyzer import RebalanceAction, RiskAssessment
+
+logger = logging.getLogger(__name__)
+
+class Urgency(Enum):
+    NORMAL = "normal"
+    ELEVATED = "elevated"
+    FORCED = "forced"
+
+class GasOracle:
+    """Rolling window of recent gas prices with a short-horizon forecast"""
+
+    def __init__(self, config):
+        self.config = config
+        self.samples = deque(maxlen=config.gas_window_size)  # (timestamp, gwei)
+        self.ewma: Optional[float] = None
+
+    def record(self, gas_data: Optional[Dict[str, Any]]) -> Optional[float]:
+        """Record a gas price response from the executor, returns the price in Gwei"""
+
+        if not gas_data or not gas_data.get("success"):
+            return None
+
+        gwei = float(gas_data["gasPrice"]["gwei"])
+        self.samples.append((time.time(), gwei))
+
+        alpha = self.config.gas_ewma_alpha
+        self.ewma = gwei if self.ewma is None else alpha * gwei + (1 - alpha) * self.ewma
+
+        return gwei
+
+    @property
+    def current(self) -> Optional[float]:
+        return self.samples[-1][1] if self.samples else None
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Percentile (0-100) of the gas prices in the window"""
+
+        if not self.samples:
+            return None
+
+        values = sorted(gwei for _, gwei in self.samples)
+        rank = (len(values) - 1) * pct / 100.0
+        low = int(rank)
+        high = min(low + 1, len(values) - 1)
+        return values[low] + (values[high] - values[low]) * (rank - low)
+
+    def forecast(self) -> Optional[float]:
+        """
+        Short-horizon forecast of the next gas price
+
+        Uses the EWMA, pulled toward the window's median so a single
+        spike does not dominate the estimate.
+        """
+
+        if self.ewma is None:
+            return None
+
+        median = self.percentile(50)
+        return 0.7 * self.ewma + 0.3 * median
+
+    def is_acceptable(self, gwei: Optional[float] = None) -> bool:
+        gwei = self.current if gwei is None else gwei
+        return gwei is not None and gwei < self.config.max_gas_price_gwei
+
+    def likely_to_drop(self) -> bool:
+        """True if the forecast expects gas to fall below the threshold soon"""
+        forecast = self.forecast()
+        return forecast is not None and forecast < self.config.max_gas_price_gwei
+
+@dataclass
+class DeferredAction:
+    user_address: str
+    action: RebalanceAction
+    assessment: RiskAssessment
+    initial_health_factor: float
+    deferred_at: float = field(default_factory=time.time)
+    urgency: Urgency = Urgency.NORMAL
+
+    def as_executable(self) -> RiskAssessment:
+        """Assessment with the original (pre gas-downgrade) action restored"""
+
+        a = self.assessment
+        return RiskAssessment(
+            risk_level=a.risk_level,
+            recommended_action=self.action,
+            health_factor=a.health_factor,
+            distance_to_liquidation=a.distance_to_liquidation,
+            correlation=a.correlation,
+            price_decoupling_risk=a.price_decoupling_risk,
+            net_apy=a.net_apy,
+            gas_acceptable=True,
+            is_profitable=a.is_profitable,
+            reasons=a.reasons + [f"Deferred action released ({self.urgency.value})"],
+            metrics=a.metrics
+        )
+
+# Only actions that reduce risk may be escalated through high gas
+ESCALATABLE_ACTIONS = (RebalanceAction.REDUCE_LOOP,)
+
+class DeferredActionQueue:
+    """
+    Rebalances postponed because of high gas, released when gas drops or urgency forces them
+
+    Risk-reducing actions escalate: ELEVATED entries go through once the gas
+    forecast says waiting will not help, FORCED entries go through
+    regardless. Other actions (ADD_LOOP) never escalate and are dropped
+    once they have waited max_deferral_seconds.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.pending: Dict[str, DeferredAction] = {}
+
+    def __len__(self):
+        return len(self.pending)
+
+    def defer(self, user_address: str, assessment: RiskAssessment):
+        """Queue or refresh a deferred action for a user"""
+
+        action = RebalanceAction(assessment.metrics["deferred_action"])
+        entry = self.pending.get(user_address)
+
+        if entry is None:
+            entry = DeferredAction(
+                user_address=user_address,
+                action=action,
+                assessment=assessment,
+                initial_health_factor=assessment.health_factor
+            )
+            self.pending[user_address] = entry
+            logger.info(f"Deferred {action.value} for {user_address} (HF {assessment.health_factor:.3f})")
+        else:
+            # Keep the original deferral time and HF, track the latest state
+            entry.action = action
+            entry.assessment = assessment
+
+        self._escalate(entry)
+
+    def discard(self, user_address: str):
+        """Drop a deferred action, e.g. once the position no longer needs it"""
+        self.pending.pop(user_address, None)
+
+    def _escalate(self, entry: DeferredAction):
+        """Raise urgency as the health factor keeps decaying or the wait grows long"""
+
+        if entry.action not in ESCALATABLE_ACTIONS:
+            return
+
+        decay = entry.initial_health_factor - entry.assessment.health_factor
+        waited = time.time() - entry.deferred_at
+        previous = entry.urgency
+
+        if (decay >= self.config.deferral_force_hf_decay or
+                waited >= self.config.max_deferral_seconds or
+                entry.assessment.health_factor < self.config.critical_health_factor + 0.05):
+            entry.urgency = Urgency.FORCED
+        elif decay >= self.config.deferral_force_hf_decay / 2 or waited >= self.config.max_deferral_seconds / 2:
+            entry.urgency = Urgency.ELEVATED
+
+        if entry.urgency != previous:
+            logger.warning(
+                f"Deferred {entry.action.value} for {entry.user_address} escalated to {entry.urgency.value} "
+                f"(HF decay {decay:.3f}, waited {waited:.0f}s)"
+            )
+
+    def release(self, gas_acceptable: bool, gas_expected_to_drop: bool = True) -> List[DeferredAction]:
+        """
+        Pop all entries that may run now
+
+        Everything runs if gas is fine. Otherwise FORCED entries run, and
+        ELEVATED ones too when the forecast does not expect gas to drop.
+        Stale non-escalatable entries are dropped.
+        """
+
+        ready = []
+        for entry in list(self.pending.values()):
+            # Time-based escalation also applies between re-assessments
+            self._escalate(entry)
+
+            if (gas_acceptable or entry.urgency == Urgency.FORCED or
+                    (entry.urgency == Urgency.ELEVATED and not gas_expected_to_drop)):
+                ready.append(entry)
+                del self.pending[entry.user_address]
+
+            elif (entry.action not in ESCALATABLE_ACTIONS and
+                    time.time() - entry.deferred_at >= self.config.max_deferral_seconds):
+                logger.info(f"Dropping stale deferred {entry.action.value} for {entry.user_address}")
+                del self.pending[entry.user_address]
+
+        return ready
@@ -0,0 +1,137 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Keeper:
+    address: str
+    in_flight: int = 0
+    sent: int = 0
+    balance: Optional[float] = None  # Native IP, None until first refresh
+    low_balance: bool = False
+
+class KeeperPool:
+    """
+    Signer accounts used to send rebalance transactions in parallel
+
+    Each action goes to the least-busy funded keeper. A user stays pinned
+    to one keeper while any of their actions is in flight, so their
+    transactions share a nonce sequence and land in order.
+
+    Balances come from refresh_balances() once per iteration; gas spent
+    by sends in between is subtracted as they complete.
+    """
+
+    def __init__(self, addresses: List[str], min_balance: float):
+        if not addresses:
+            raise ValueError("Keeper pool needs at least one account")
+
+        self.keepers = {address: Keeper(address) for address in addresses}
+        self.min_balance = min_balance
+        self._pinned: Dict[str, Tuple[Keeper, int]] = {}  # user -> (keeper, actions in flight)
+        self._alerts: List[Dict[str, Any]] = []  # Raised on worker threads, returned by refresh_balances()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keepers)
+
+    def acquire(self, user_address: str) -> Optional[Keeper]:
+        """Reserve a keeper for one action; None if every keeper is below the minimum balance"""
+
+        with self._lock:
+            pinned = self._pinned.get(user_address)
+            if pinned is not None:
+                keeper, count = pinned
+                self._pinned[user_address] = (keeper, count + 1)
+                keeper.in_flight += 1
+                return keeper
+
+            funded = [k for k in self.keepers.values() if not k.low_balance]
+            if not funded:
+                return None
+
+            keeper = min(funded, key=lambda k: (k.in_flight, -(k.balance or 0.0)))
+            keeper.in_flight += 1
+            self._pinned[user_address] = (keeper, 1)
+            return keeper
+
+    def release(self, user_address: str, keeper: Keeper, sent: bool = True, gas_spent: float = 0.0):
+        """Return a keeper after its call returned, charging `gas_spent` (IP) to its balance"""
+
+        with self._lock:
+            keeper.in_flight -= 1
+            if sent:
+                keeper.sent += 1
+            if gas_spent and keeper.balance is not None:
+                self._queue_alert(self._set_balance(keeper, keeper.balance - gas_spent))
+
+            _, count = self._pinned[user_address]
+            if count <= 1:
+                del self._pinned[user_address]
+            else:
+                self._pinned[user_address] = (keeper, count - 1)
+
+    def is_busy(self, user_address: str) -> bool:
+        with self._lock:
+            return user_address in self._pinned
+
+    def mark_unfunded(self, keeper: Keeper):
+        """Stop using a keeper that could not pay for gas, until a refresh shows it funded again"""
+
+        with self._lock:
+            self._queue_alert(self._set_balance(keeper, 0.0))
+
+    def update_balance(self, address: str, balance: float) -> Optional[Dict[str, Any]]:
+        """Record a keeper balance; returns an alert when it first drops below the minimum"""
+
+        with self._lock:
+            return self._set_balance(self.keepers[address], balance)
+
+    def _queue_alert(self, alert: Optional[Dict[str, Any]]):
+        if alert:
+            self._alerts.append(alert)
+
+    def _set_balance(self, keeper: Keeper, balance: float) -> Optional[Dict[str, Any]]:
+        address = keeper.address
+        was_low = keeper.low_balance
+        keeper.balance = balance
+        keeper.low_balance = balance < self.min_balance
+
+        if keeper.low_balance and not was_low:
+            logger.warning(f"Keeper {address} balance low: {balance:.4f} IP (min {self.min_balance})")
+            return {"type": "keeper_low_balance", "keeper": address, "balance": balance, "min_balance": self.min_balance}
+        if was_low and not keeper.low_balance:
+            logger.info(f"Keeper {address} refunded: {balance:.4f} IP")
+        return None
+
+    def refresh_balances(self, executor) -> List[Dict[str, Any]]:
+        """Query every keeper balance, returns low-balance alerts"""
+
+        with self._lock:
+            alerts, self._alerts = self._alerts, []
+
+        for address in self.keepers:
+            result = executor.get_signer_balance(address)
+            if not result.get("success"):
+                logger.error(f"Failed to query keeper balance for {address}: {result.get('error')}")
+                continue
+            alert = self.update_balance(address, float(result["balance"]))
+            if alert:
+                alerts.append(alert)
+        return alerts
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "address": k.address,
+                    "in_flight": k.in_flight,
+                    "sent": k.sent,
+                    "balance": k.balance,
+                    "low_balance": k.low_balance
+                }
+                for k in self.keepers.values()
+            ]
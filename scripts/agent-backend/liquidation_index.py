@@ -0,0 +1,80 @@
+import bisect
+from typing import Dict, List, Optional, Tuple
+
+class LiquidationIndex:
+    """
+    Users sorted by liquidation price (stIP/IP ratio at which HF reaches 1)
+
+    Prices are in IP per stIP, the same unit as prices.stIP / prices.wip
+    from calculate_correlation, which is what queries compare against.
+
+    Kept up to date incrementally from each position query, so fleet-wide
+    "who is liquidated if stIP drops X%" questions are a bisect, not a
+    re-query of every user.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[float, str]] = []  # sorted (liquidation_price, user)
+        self._prices: Dict[str, float] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, user_address: str):
+        return user_address in self._prices
+
+    def get(self, user_address: str) -> Optional[float]:
+        return self._prices.get(user_address)
+
+    def update(self, user_address: str, liquidation_price: float):
+        """Insert or move a user; a non-positive price (no debt) removes them"""
+
+        old = self._prices.get(user_address)
+        if old == liquidation_price:
+            return
+        if old is not None:
+            self._remove_entry(old, user_address)
+
+        if liquidation_price > 0:
+            bisect.insort(self._entries, (liquidation_price, user_address))
+            self._prices[user_address] = liquidation_price
+        else:
+            self._prices.pop(user_address, None)
+
+    def update_from_position(self, user_address: str, position_data: Dict):
+        """Update from a query_position response (risk.liquidationPrice is an stIP/IP ratio)"""
+
+        if not position_data.get("position", {}).get("hasPosition"):
+            self.remove(user_address)
+            return
+
+        liquidation_price = position_data.get("risk", {}).get("liquidationPrice")
+        if liquidation_price is not None:
+            self.update(user_address, float(liquidation_price))
+
+    def remove(self, user_address: str):
+        old = self._prices.pop(user_address, None)
+        if old is not None:
+            self._remove_entry(old, user_address)
+
+    def _remove_entry(self, price: float, user_address: str):
+        i = bisect.bisect_left(self._entries, (price, user_address))
+        if i < len(self._entries) and self._entries[i] == (price, user_address):
+            del self._entries[i]
+
+    def liquidated_at(self, price: float) -> List[str]:
+        """Users liquidated if the price falls to `price`, most exposed first"""
+
+        i = bisect.bisect_left(self._entries, (price,))
+        return [user for _, user in reversed(self._entries[i:])]
+
+    def liquidated_by_drop(self, current_price: float, drop: float) -> List[str]:
+        """Users liquidated by a fractional price drop (0.04 = 4%) from `current_price`"""
+        return self.liquidated_at(current_price * (1 - drop))
+
+    def between(self, low: float, high: float) -> List[str]:
+        """Users with a liquidation price in [low, high)"""
+
+        lo = bisect.bisect_left(self._entries, (low,))
+        hi = bisect.bisect_left(self._entries, (high,))
+        return [user for _, user in self._entries[lo:hi]]
@@ -1,5 +1,7 @@
 import os
 import sys
+import signal
+import argparse
 import logging
 from config import AgentConfig
 from monitoring_agent import MonitoringAgent
@@ -16,15 +18,33 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="IP Rewards Autostaker monitoring agent")
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile every Nth monitoring iteration and write hot-function reports")
+    parser.add_argument("--profile-every", type=int, default=None,
+                        help="Profile every Nth iteration (default: PROFILE_EVERY or 10)")
+    parser.add_argument("--profile-dir", default=None,
+                        help="Directory for profiles and hot_functions.txt (default: PROFILE_DIR or ./profiles)")
+    return parser.parse_args()
+
 def main():
     """Main entry point for the autonomous agent"""
     
+    args = parse_args()
+    
     logger.info("=" * 60)
     logger.info("IP Rewards Autostaker - Autonomous Monitoring Agent")
     logger.info("=" * 60)
     
     # Load configuration
     config = AgentConfig.from_env()
+    if args.profile:
+        config.profile = True
+        if args.profile_every is not None:
+            config.profile_every_n = args.profile_every
+        if args.profile_dir is not None:
+            config.profile_dir = args.profile_dir
     
     logger.info(f"\nConfiguration:")
     logger.info(f"  Strategy: {config.risk_strategy.value}")
@@ -32,6 +52,8 @@ def main():
     logger.info(f"  Target Health Factor: {config.target_health_factor}")
     logger.info(f"  Min Health Factor: {config.min_health_factor}")
     logger.info(f"  Network: {config.network}")
+    if config.profile:
+        logger.info(f"  Profiling: every {config.profile_every_n} iterations -> {config.profile_dir}")
     
     # Get monitored users from environment
     monitored_users_str = os.getenv("MONITORED_USERS", "")
@@ -53,6 +75,9 @@ def main():
     logger.info("Press Ctrl+C to stop")
     logger.info("=" * 60 + "\n")
     
+    # Turn SIGTERM into SystemExit so the agent's shutdown path (history flush) runs
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
     agent.run()
 
 if __name__ == "__main__":
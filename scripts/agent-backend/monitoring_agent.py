@@ -1,32 +1,91 @@
 import time
 import logging
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Optional
 from datetime import datetime
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, Future
 from config import AgentConfig
-from hardhat_interface.executor import HardhatExecutor
-from risk_analyzer import RiskAnalyzer, RiskLevel, RebalanceAction
+from risk_analyzer import RiskAnalyzer, RiskLevel, RebalanceAction, RiskAssessment
 from rebalancer import Rebalancer
-from openai import OpenAI
+from gas_oracle import GasOracle, DeferredActionQueue
+from executors import Executor, create_executor, supports_keepers
+from liquidation_index import LiquidationIndex
+from agent_state import AgentState
+from keeper_pool import KeeperPool
+from profiling import IterationProfiler, profiled
 
 logger = logging.getLogger(__name__)
 
+class ExecutorUnavailable(RuntimeError):
+    """The executor could not be constructed; the agent cannot run without it"""
+
 class MonitoringAgent:
     """Autonomous agent that monitors positions and triggers rebalancing"""
     
-    def __init__(self, config: AgentConfig, monitored_users: List[str]):
+    def __init__(
+        self,
+        config: AgentConfig,
+        monitored_users: List[str],
+        executor: Optional[Executor] = None
+    ):
         self.config = config
         self.monitored_users = monitored_users
         
         # Initialize components
-        self.executor = HardhatExecutor(config.hardhat_dir, config.network)
         self.analyzer = RiskAnalyzer(config)
-        self.rebalancer = Rebalancer(config, self.executor)
+        self.gas_oracle = GasOracle(config)
+        self.deferred_actions = DeferredActionQueue(config)
+        self.liquidation_index = LiquidationIndex()
+        self.history = self._create_history_store()
+        
+        self.profiler = None
+        if config.profile:
+            self.profiler = IterationProfiler(
+                config.profile_dir,
+                every_n=config.profile_every_n,
+                top_n=config.profile_top_n
+            )
+        
+        # Latest state for the dashboard API
+        self.state = AgentState()
+        self.api_server = None
         
-        # Initialize OpenAI for summaries
-        self.openai_client = OpenAI()
+        # Keeper accounts send on-chain rebalances in parallel, one worker per keeper
+        # (disabled once the executor is known if its backend cannot use them)
+        self.keeper_pool = None
+        self._rebalance_pool = None
+        self._in_flight: Dict[str, RebalanceAction] = {}
+        self._in_flight_lock = threading.Lock()
+        if config.keeper_accounts:
+            self.keeper_pool = KeeperPool(config.keeper_accounts, config.min_keeper_balance)
+            self._rebalance_pool = ThreadPoolExecutor(
+                max_workers=len(self.keeper_pool),
+                thread_name_prefix="rebalance"
+            )
+        
+        # Executor is built in the background unless one is injected; first use waits for it
+        self._startup_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-startup")
+        if executor is not None:
+            self._check_keeper_support(executor)
+            self._executor_future = Future()
+            self._executor_future.set_result(executor)
+        else:
+            self._executor_future = self._startup_pool.submit(self._create_executor)
+        self._rebalancer = None
+        
+        # OpenAI client is created on first summary
+        self._openai_client = None
         
         # State tracking
         self.last_correlation_check = 0
+        self.correlation_data = None  # Last successful correlation check
+        self.last_price_ratio = None
+        self.last_correlation = None
+        
+        # Change detection: reuse assessments whose inputs have not moved
+        self.global_fingerprint = None
+        self.assessment_cache: Dict[str, tuple] = {}  # user -> (fingerprint, assessment)
         self.system_status = None
         self.alert_history = []
         
@@ -34,49 +93,190 @@ class MonitoringAgent:
         logger.info(f"Strategy: {config.risk_strategy.value}")
         logger.info(f"Monitoring {len(monitored_users)} users")
     
+    def _create_history_store(self):
+        """Time-series store for assessments, if configured (numpy is only imported then)"""
+        
+        if not self.config.timeseries_dir:
+            return None
+        
+        from timeseries_store import TimeSeriesStore
+        
+        return TimeSeriesStore(
+            self.config.timeseries_dir,
+            raw_retention_seconds=self.config.timeseries_raw_retention_days * 86400
+        )
+    
+    def _start_api_server(self):
+        """Serve cached state to the frontend (aiohttp is only imported here)"""
+        
+        from api_server import ApiServer
+        
+        self.api_server = ApiServer(
+            self.state,
+            self.config.api_host,
+            self.config.api_port,
+            cors_origin=self.config.api_cors_origin
+        )
+        try:
+            self.api_server.start()
+        except RuntimeError as e:
+            # The dashboard is optional, keep monitoring without it
+            logger.error(f"{e}, continuing without the API")
+            self.api_server = None
+    
+    def _create_executor(self) -> Executor:
+        """Construct the configured executor (runs on the startup thread)"""
+        
+        executor = create_executor(self.config)
+        self._check_keeper_support(executor)
+        logger.info(f"Executor ready ({self.config.executor_backend})")
+        return executor
+    
+    def _check_keeper_support(self, executor: Executor):
+        """Fall back to the default signer if the backend cannot send from keeper accounts"""
+        
+        if self.keeper_pool is None:
+            return
+        if supports_keepers(executor):
+            logger.info(f"Sending rebalances from {len(self.keeper_pool)} keeper account(s)")
+            return
+        
+        logger.warning(
+            f"Executor backend '{self.config.executor_backend}' does not support keeper accounts, "
+            f"ignoring {len(self.keeper_pool)} configured keeper(s)"
+        )
+        self.keeper_pool = None
+        self._rebalance_pool.shutdown(wait=False)
+        self._rebalance_pool = None
+    
+    @staticmethod
+    def _log_startup_failure(future: Future):
+        """Surface exceptions from work submitted to the startup thread"""
+        
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Background startup task failed: {error}", exc_info=error)
+    
+    @property
+    def executor(self) -> Executor:
+        try:
+            return self._executor_future.result()
+        except Exception as e:
+            raise ExecutorUnavailable(f"Executor construction failed: {type(e).__name__}: {e}") from e
+    
+    @property
+    def rebalancer(self) -> Rebalancer:
+        if self._rebalancer is None:
+            self._rebalancer = Rebalancer(self.config, self.executor, self.keeper_pool)
+        return self._rebalancer
+    
+    @property
+    def openai_client(self):
+        if self._openai_client is None:
+            from openai import OpenAI
+            self._openai_client = OpenAI()
+        return self._openai_client
+    
     def run(self):
         """Main monitoring loop"""
         
         logger.info("Starting monitoring loop...")
         
+        if self.config.api_port:
+            self._start_api_server()
+        
         # Initial system check
-        self._check_system_status()
+        if self.config.fast_start:
+            # Runs on the startup thread once the executor is ready,
+            # while the first health factor sweep starts right away
+            future = self._startup_pool.submit(self._check_system_status)
+            future.add_done_callback(self._log_startup_failure)
+        else:
+            self._check_system_status()
         
         iteration = 0
-        while True:
+        consecutive_errors = 0
+        try:
+            while True:
+                try:
+                    iteration += 1
+                    
+                    profile = self.profiler.profile(iteration) if self.profiler else nullcontext()
+                    with profile:
+                        self._run_iteration(iteration)
+                    
+                    # Wait before next check
+                    logger.info(f"\nSleeping for {self.config.check_interval_seconds} seconds...")
+                    consecutive_errors = 0
+                    self._wait_for_next_iteration()
+                    
+                except KeyboardInterrupt:
+                    logger.info("\nShutting down monitoring agent...")
+                    break
+                except ExecutorUnavailable as e:
+                    # Retrying cannot help: fail fast so the process exits non-zero
+                    logger.critical(f"{e}, shutting down")
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in monitoring loop: {e}", exc_info=True)
+                    # Back off 5s, 10s, 20s... up to 1 minute before retrying
+                    consecutive_errors += 1
+                    time.sleep(min(60, 5 * 2 ** (consecutive_errors - 1)))
+        finally:
+            # Also runs on SystemExit (SIGTERM, see main.py), so buffered history is not lost
+            if self.history is not None:
+                self.history.flush()
+    
+    def _run_iteration(self, iteration: int):
+        """One monitoring pass over all users"""
+        
+        logger.info(f"\n{'='*60}")
+        logger.info(f"Monitoring Iteration #{iteration} - {datetime.now()}")
+        logger.info(f"{'='*60}\n")
+        
+        # Backends with a simulated clock (fake chain) step it here, once per iteration
+        begin_iteration = getattr(self.executor, "begin_iteration", None)
+        if begin_iteration is not None:
+            begin_iteration(iteration)
+        
+        # Check correlation periodically; iterations in between (and failed
+        # checks) keep using the last good result, so assessments and the
+        # global fingerprint see the same market inputs every iteration
+        fresh_correlation = None
+        if time.time() - self.last_correlation_check > self.config.correlation_check_interval:
+            fresh_correlation = self._check_correlation()
+            self.last_correlation_check = time.time()
+            if fresh_correlation.get("success"):
+                self.correlation_data = fresh_correlation
+        correlation_data = self.correlation_data
+        
+        # Get gas price
+        gas_data = self.executor.get_gas_price()
+        self.gas_oracle.record(gas_data)
+        
+        self._check_global_inputs(correlation_data, gas_data)
+        
+        if self.keeper_pool is not None:
+            for alert in self.keeper_pool.refresh_balances(self.executor):
+                self.state.publish_alert(alert)
+        
+        # Monitor each user, most exposed first after a sharp price move
+        for user_address in self._monitoring_order(fresh_correlation):
             try:
-                iteration += 1
-                logger.info(f"\n{'='*60}")
-                logger.info(f"Monitoring Iteration #{iteration} - {datetime.now()}")
-                logger.info(f"{'='*60}\n")
-                
-                # Check correlation periodically
-                correlation_data = None
-                if time.time() - self.last_correlation_check > self.config.correlation_check_interval:
-                    correlation_data = self._check_correlation()
-                    self.last_correlation_check = time.time()
-                
-                # Get gas price
-                gas_data = self.executor.get_gas_price()
-                
-                # Monitor each user
-                for user_address in self.monitored_users:
-                    self._monitor_user(user_address, correlation_data, gas_data)
-                
-                # Generate AI summary every 5 iterations
-                if iteration % 5 == 0:
-                    self._generate_ai_summary()
-                
-                # Wait before next check
-                logger.info(f"\nSleeping for {self.config.check_interval_seconds} seconds...")
-                time.sleep(self.config.check_interval_seconds)
-                
-            except KeyboardInterrupt:
-                logger.info("\nShutting down monitoring agent...")
-                break
+                self._monitor_user(user_address, correlation_data, gas_data)
             except Exception as e:
-                logger.error(f"Error in monitoring loop: {e}", exc_info=True)
-                time.sleep(60)  # Wait 1 minute before retrying
+                # One bad user must not stop the sweep for everyone else
+                logger.error(f"Error monitoring {user_address}: {e}", exc_info=True)
+        
+        # Forced deferred actions go through even if gas is still high
+        self._process_deferred_actions()
+        
+        if self.history is not None:
+            self.history.maintain()
+        
+        # Generate AI summary every 5 iterations
+        if iteration % 5 == 0:
+            self._generate_ai_summary()
     
     def _monitor_user(
         self,
@@ -95,30 +295,183 @@ class MonitoringAgent:
             logger.error(f"Failed to query position: {position_data.get('error')}")
             return
         
-        # Assess risk
-        assessment = self.analyzer.assess_position(
-            position_data,
-            correlation_data,
-            gas_data
-        )
+        self.liquidation_index.update_from_position(user_address, position_data)
+        
+        # Assess risk, reusing the previous assessment if nothing material changed
+        fingerprint = self.analyzer.position_fingerprint(position_data)
+        cached = self.assessment_cache.get(user_address)
+        
+        if cached is not None and cached[0] == fingerprint:
+            assessment = cached[1]
+        else:
+            assessment = self.analyzer.assess_position(
+                position_data,
+                correlation_data,
+                gas_data
+            )
+            self.assessment_cache[user_address] = (fingerprint, assessment)
+            
+            # Log and publish only changed assessments
+            self._log_assessment(user_address, assessment)
+            self.state.publish_assessment(user_address, assessment, datetime.now().isoformat())
         
-        # Log assessment
-        self._log_assessment(user_address, assessment)
+        if self.history is not None:
+            self.history.append(user_address, assessment)
+        
+        # Postpone gas-delayed rebalances instead of dropping them
+        if "deferred_action" in assessment.metrics:
+            self.deferred_actions.defer(user_address, assessment)
+        else:
+            self.deferred_actions.discard(user_address)
         
         # Execute rebalancing if needed
         if assessment.recommended_action != RebalanceAction.NONE:
+            self._rebalance(user_address, assessment)
+    
+    def _check_global_inputs(self, correlation_data: Dict[str, Any], gas_data: Dict[str, Any]):
+        """Drop all cached assessments when shared inputs (correlation, prices, gas) change"""
+        
+        fingerprint = self.analyzer.global_fingerprint(correlation_data, gas_data)
+        if fingerprint != self.global_fingerprint:
+            if self.assessment_cache:
+                logger.info("Global inputs changed, re-assessing all positions")
+            self.global_fingerprint = fingerprint
+            self.assessment_cache.clear()
+    
+    def _monitoring_order(self, correlation_data: Dict[str, Any]) -> List[str]:
+        """
+        Order users for this iteration
+        
+        On a sharp stIP/IP move or a sharp correlation drop, users whose
+        liquidation price (stIP/IP ratio, see LiquidationIndex) lies within
+        price_shock_buffer of the current ratio are checked first.
+        """
+        
+        if not correlation_data or not correlation_data.get("success"):
+            return self.monitored_users
+        
+        prices = correlation_data["prices"]
+        ip_price = float(prices["wip"])
+        if ip_price <= 0:
+            return self.monitored_users
+        
+        ratio = float(prices["stIP"]) / ip_price
+        previous, self.last_price_ratio = self.last_price_ratio, ratio
+        
+        correlation = float(correlation_data["correlation"]["estimate"])
+        previous_correlation, self.last_correlation = self.last_correlation, correlation
+        
+        reasons = []
+        if previous is not None and abs(ratio / previous - 1) >= self.config.sharp_price_move_threshold:
+            reasons.append(f"price move {previous:.4f} -> {ratio:.4f}")
+        if (previous_correlation is not None and
+                previous_correlation - correlation >= self.config.sharp_correlation_drop):
+            reasons.append(f"correlation drop {previous_correlation:.3f} -> {correlation:.3f}")
+        if not reasons:
+            return self.monitored_users
+        
+        exposed = self.liquidation_index.liquidated_by_drop(ratio, self.config.price_shock_buffer)
+        logger.warning(
+            f"Sharp {', '.join(reasons)}, "
+            f"re-checking {len(exposed)} exposed user(s) first"
+        )
+        
+        first = set(exposed)
+        return exposed + [user for user in self.monitored_users if user not in first]
+    
+    def _wait_for_next_iteration(self):
+        """
+        Sleep until the next iteration
+        
+        While rebalances are deferred, gas is polled at a shorter interval so
+        they run as soon as it drops below the threshold.
+        """
+        
+        deadline = time.time() + self.config.check_interval_seconds
+        
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            
+            if not self.deferred_actions:
+                time.sleep(remaining)
+                return
+            
+            time.sleep(min(self.config.gas_poll_interval_seconds, remaining))
+            
+            gwei = self.gas_oracle.record(self.executor.get_gas_price())
+            if gwei is not None:
+                logger.info(
+                    f"Gas {gwei:.1f} Gwei (forecast {self.gas_oracle.forecast():.1f}), "
+                    f"{len(self.deferred_actions)} deferred action(s)"
+                )
+            self._process_deferred_actions()
+    
+    def _process_deferred_actions(self):
+        """Run deferred rebalances that gas or urgency now allow"""
+        
+        releasable = self.deferred_actions.release(
+            self.gas_oracle.is_acceptable(),
+            gas_expected_to_drop=self.gas_oracle.likely_to_drop()
+        )
+        for entry in releasable:
+            logger.info(f"Releasing deferred {entry.action.value} for {entry.user_address} ({entry.urgency.value})")
+            
+            self._rebalance(entry.user_address, entry.as_executable())
+    
+    def _rebalance(self, user_address: str, assessment: RiskAssessment):
+        """
+        Execute a rebalance, log it and store the alert
+        
+        With a keeper pool, on-chain actions are sent from worker threads so
+        several users' transactions are in flight at once. A user's action
+        is skipped while the same action is still in flight for them, which
+        includes a transaction still being sent after its timeout.
+        """
+        
+        action = assessment.recommended_action
+        if self._rebalance_pool is None or action not in (
+                RebalanceAction.REDUCE_LOOP, RebalanceAction.EMERGENCY_UNWIND):
+            self._execute_rebalance(user_address, assessment)
+            return
+        
+        with self._in_flight_lock:
+            if self._in_flight.get(user_address) == action:
+                logger.info(f"{action.value} already in flight for {user_address}, skipping")
+                return
+            self._in_flight[user_address] = action
+        
+        self._rebalance_pool.submit(profiled(self._execute_rebalance), user_address, assessment, True)
+    
+    def _execute_rebalance(self, user_address: str, assessment: RiskAssessment, in_flight: bool = False):
+        try:
             result = self.rebalancer.execute_rebalance(user_address, assessment)
             self._log_rebalance_result(user_address, result)
             
             # Store alert
-            self.alert_history.append({
-                "timestamp": datetime.now().isoformat(),
-                "user": user_address,
-                "risk_level": assessment.risk_level.value,
-                "action": assessment.recommended_action.value,
-                "result": result,
-                "reasons": assessment.reasons
-            })
+            self._record_alert(user_address, assessment, result)
+        except Exception as e:
+            logger.error(f"Rebalance failed for {user_address}: {e}", exc_info=True)
+        finally:
+            if in_flight:
+                with self._in_flight_lock:
+                    if self._in_flight.get(user_address) == assessment.recommended_action:
+                        del self._in_flight[user_address]
+    
+    def _record_alert(self, user_address: str, assessment: RiskAssessment, result: Dict[str, Any]):
+        """Store an alert for AI summaries and the dashboard API"""
+        
+        alert = {
+            "timestamp": datetime.now().isoformat(),
+            "user": user_address,
+            "risk_level": assessment.risk_level.value,
+            "action": assessment.recommended_action.value,
+            "result": result,
+            "reasons": assessment.reasons
+        }
+        self.alert_history.append(alert)
+        self.state.publish_alert(alert)
     
     def _check_system_status(self):
         """Check overall system status"""
@@ -154,39 +507,41 @@ class MonitoringAgent:
             
             if corr < self.config.correlation_threshold:
                 logger.warning(f"LOW CORRELATION ALERT: {corr:.4f}")
+            
+            self.state.publish_correlation(correlation_data)
         
         return correlation_data
     
-def _log_assessment(self, user_address: str, assessment: RiskAssessment):
-    """Log risk assessment details"""
+    def _log_assessment(self, user_address: str, assessment: RiskAssessment):
+        """Log risk assessment details"""
     
-    logger.info(f"\n--- Risk Assessment for {user_address} ---")
-    logger.info(f"Risk Level: {assessment.risk_level.value.upper()}")
-    logger.info(f"Recommended Action: {assessment.recommended_action.value}")
-    logger.info(f"Health Factor: {assessment.health_factor:.3f}")
-    logger.info(f"Distance to Liquidation: {assessment.distance_to_liquidation:.2%}")
-    logger.info(f"Correlation: {assessment.correlation:.4f}")
-    logger.info(f"Price Decoupling Risk: {assessment.price_decoupling_risk:.2%}")
-    logger.info(f"Net APY: {assessment.net_apy:.2%}")
-    logger.info(f"Profitable: {'YES' if assessment.is_profitable else 'NO'}")
-    logger.info(f"Gas Acceptable: {assessment.gas_acceptable}")
+        logger.info(f"\n--- Risk Assessment for {user_address} ---")
+        logger.info(f"Risk Level: {assessment.risk_level.value.upper()}")
+        logger.info(f"Recommended Action: {assessment.recommended_action.value}")
+        logger.info(f"Health Factor: {assessment.health_factor:.3f}")
+        logger.info(f"Distance to Liquidation: {assessment.distance_to_liquidation:.2%}")
+        logger.info(f"Correlation: {assessment.correlation:.4f}")
+        logger.info(f"Price Decoupling Risk: {assessment.price_decoupling_risk:.2%}")
+        logger.info(f"Net APY: {assessment.net_apy:.2%}")
+        logger.info(f"Profitable: {'YES' if assessment.is_profitable else 'NO'}")
+        logger.info(f"Gas Acceptable: {assessment.gas_acceptable}")
     
-    # Log APY breakdown
-    if "staking_apy" in assessment.metrics:
-        logger.info(f"\nAPY Breakdown:")
-        logger.info(f"  Staking APY: {assessment.metrics['staking_apy']:.2%}")
-        logger.info(f"  Supply APY: {assessment.metrics['supply_apy']:.2%}")
-        logger.info(f"  Borrow APY: {assessment.metrics['borrow_apy']:.2%}")
-        logger.info(f"  Current Net: {assessment.net_apy:.2%}")
-        if "next_loop_apy" in assessment.metrics:
-            logger.info(f"  Next Loop APY: {assessment.metrics['next_loop_apy']:.2%}")
+        # Log APY breakdown
+        if "staking_apy" in assessment.metrics:
+            logger.info(f"\nAPY Breakdown:")
+            logger.info(f"  Staking APY: {assessment.metrics['staking_apy']:.2%}")
+            logger.info(f"  Supply APY: {assessment.metrics['supply_apy']:.2%}")
+            logger.info(f"  Borrow APY: {assessment.metrics['borrow_apy']:.2%}")
+            logger.info(f"  Current Net: {assessment.net_apy:.2%}")
+            if "next_loop_apy" in assessment.metrics:
+                logger.info(f"  Next Loop APY: {assessment.metrics['next_loop_apy']:.2%}")
     
-    if assessment.reasons:
-        logger.info("\nReasons:")
-        for reason in assessment.reasons:
-            logger.info(f"  - {reason}")
+        if assessment.reasons:
+            logger.info("\nReasons:")
+            for reason in assessment.reasons:
+                logger.info(f"  - {reason}")
     
-    logger.info("---\n")
+        logger.info("---\n")
     
     def _log_rebalance_result(self, user_address: str, result: Dict[str, Any]):
         """Log rebalancing execution result"""
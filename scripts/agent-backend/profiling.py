@@ -0,0 +1,159 @@
+import io
+import os
+import sys
+import time
+import pstats
+import logging
+import cProfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class _WorkerProfiles:
+    """Profiles collected from worker threads during one sampled iteration"""
+
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def add(self, profiler: cProfile.Profile):
+        with self._lock:
+            self.profiles.append(profiler)
+
+    def take(self) -> List[cProfile.Profile]:
+        with self._lock:
+            profiles, self.profiles = self.profiles, []
+            return profiles
+
+# Set while a sampled iteration runs; read by profiled() in worker threads
+_active: Optional[_WorkerProfiles] = None
+
+# From 3.12 cProfile runs on sys.monitoring, which takes one profiler per
+# interpreter: enabling a second one on a worker thread raises ValueError
+_PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+def profiled(fn: Callable) -> Callable:
+    """
+    Wrap a callable submitted to a worker pool so it is profiled on its own thread
+
+    cProfile only sees the thread it is enabled on. Pools that run agent
+    work (RPC calls, keeper rebalances) submit through this, and their
+    per-call profiles are merged into the iteration's profile. Outside a
+    sampled iteration it costs one global lookup.
+
+    On Python 3.12+ worker calls run unprofiled, so only the monitoring
+    thread's own time is sampled.
+    """
+
+    def call(*args, **kwargs):
+        session = _active
+        if session is None or not _PER_THREAD_PROFILES:
+            return fn(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            session.add(profiler)
+    return call
+
+class IterationProfiler:
+    """
+    cProfile every Nth monitoring iteration
+
+    Each sampled iteration is written to <output_dir>/iteration_<n>.prof
+    (loadable with pstats or snakeviz), and a top-N hot-functions report
+    over the last `keep` samples is rewritten to hot_functions.txt.
+    Overhead is bounded: unsampled iterations run unprofiled, and only
+    `keep` profiles are kept on disk and aggregated.
+
+    Work submitted through profiled() to worker threads (rpc-call,
+    rebalance) is profiled on those threads and merged in, so times in the
+    report are summed across threads and can exceed the iteration's wall
+    time. Worker calls still running when the iteration ends are not
+    included. On Python 3.12+ worker threads are not profiled (see
+    profiled()).
+    """
+
+    def __init__(self, output_dir: str, every_n: int = 10, top_n: int = 30, keep: int = 20):
+        self.output_dir = output_dir
+        self.every_n = max(1, every_n)
+        self.top_n = top_n
+        self.keep = keep
+        self.recent = deque()  # (iteration, path, wall seconds)
+
+        os.makedirs(output_dir, exist_ok=True)
+
+    @contextmanager
+    def profile(self, iteration: int):
+        """Profile the wrapped block if this iteration is sampled"""
+
+        if iteration % self.every_n:
+            yield
+            return
+
+        global _active
+        workers = _WorkerProfiles()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        _active = workers
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            _active = None
+            elapsed = time.perf_counter() - start
+            try:
+                self._save(iteration, profiler, workers.take(), elapsed)
+            except OSError as e:
+                logger.error(f"Failed to write profile for iteration {iteration}: {e}")
+
+    def _save(self, iteration: int, profiler: cProfile.Profile, workers: List[cProfile.Profile], elapsed: float):
+        path = os.path.join(self.output_dir, f"iteration_{iteration:06d}.prof")
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        for worker in workers:
+            stats.add(worker)
+        stats.dump_stats(path)
+        self.recent.append((iteration, path, elapsed))
+
+        while len(self.recent) > self.keep:
+            _, old_path, _ = self.recent.popleft()
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+
+        self._write_report()
+        logger.info(f"Profiled iteration #{iteration} ({elapsed:.2f}s, {len(workers)} worker calls) -> {path}")
+
+    def _write_report(self):
+        """Rewrite the rolling top-N report over all kept profiles"""
+
+        stats = pstats.Stats(self.recent[0][1], stream=io.StringIO())
+        for _, path, _ in list(self.recent)[1:]:
+            stats.add(path)
+
+        out = io.StringIO()
+        stats.stream = out
+
+        walls = [elapsed for _, _, elapsed in self.recent]
+        out.write(f"Iterations profiled: {', '.join(str(i) for i, _, _ in self.recent)}\n")
+        out.write(f"Wall time per iteration: avg {sum(walls) / len(walls):.3f}s, max {max(walls):.3f}s\n")
+        out.write("Times below are summed over the monitoring thread and worker threads\n\n")
+
+        out.write(f"=== Top {self.top_n} by cumulative time ===\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+        out.write(f"\n=== Top {self.top_n} by own time ===\n")
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top_n)
+
+        report = os.path.join(self.output_dir, "hot_functions.txt")
+        tmp = report + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(out.getvalue())
+        os.replace(tmp, report)
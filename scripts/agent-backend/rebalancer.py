@@ -1,16 +1,18 @@
 import logging
 from typing import Dict, Any, Optional
 from risk_analyzer import RebalanceAction, RiskAssessment
-from hardhat_interface.executor import HardhatExecutor
+from executors import Executor
+from keeper_pool import Keeper, KeeperPool
 
 logger = logging.getLogger(__name__)
 
 class Rebalancer:
     """Executes rebalancing actions based on risk assessments"""
     
-    def __init__(self, config, executor: HardhatExecutor):
+    def __init__(self, config, executor: Executor, keeper_pool: Optional[KeeperPool] = None):
         self.config = config
         self.executor = executor
+        self.keeper_pool = keeper_pool
         self.last_rebalance_time = {}  # Track last rebalance per user
         
     def execute_rebalance(
@@ -60,6 +62,69 @@ class Rebalancer:
         
         return {"action": "unknown", "success": False, "message": "Unknown action"}
     
+    def _send(self, **kwargs) -> Dict[str, Any]:
+        """Send a rebalance transaction, from a pooled keeper account if configured"""
+        
+        if self.keeper_pool is None:
+            return self._send_from(None, kwargs)
+        
+        user_address = kwargs["user_address"]
+        result = None
+        # One try per keeper, then the default signer once none is funded
+        for attempt in range(len(self.keeper_pool) + 1):
+            keeper = self.keeper_pool.acquire(user_address)
+            if keeper is None:
+                logger.error("All keeper accounts below minimum balance, using default signer")
+                return self._send_from(None, kwargs)
+            if attempt and keeper.low_balance:
+                # Still pinned to the unfunded keeper by another action in flight
+                self.keeper_pool.release(user_address, keeper, sent=False)
+                break
+            
+            logger.info(f"Sending from keeper {keeper.address} ({keeper.in_flight} in flight)")
+            try:
+                result = self._send_from(keeper, kwargs)
+            except Exception:
+                self.keeper_pool.release(user_address, keeper, sent=False)
+                raise
+            self.keeper_pool.release(
+                user_address, keeper,
+                sent=bool(result.get("txHash")),
+                gas_spent=self._gas_spent(result)
+            )
+            
+            if "insufficient funds" not in (result.get("error") or "").lower():
+                break
+            # Spent down since the last balance refresh
+            logger.warning(f"Keeper {keeper.address} cannot pay for gas, retrying from another keeper")
+            self.keeper_pool.mark_unfunded(keeper)
+        
+        return result
+    
+    def _send_from(self, keeper: Optional[Keeper], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        if keeper is not None:
+            kwargs = dict(kwargs, signer=keeper.address)
+        result = self.executor.execute_rebalance(**kwargs)
+        
+        # A timed-out transaction may still be sent. A keeper (and the user
+        # pinned to it) is held until it returns, so the next transaction
+        # cannot race it on the same nonce; this runs on a keeper worker.
+        pending = result.pop("pending", None)
+        if pending is not None and keeper is not None:
+            logger.warning(f"Transaction from keeper {keeper.address} timed out, waiting for it to return")
+            result = pending.result()
+        return result
+    
+    def _gas_spent(self, result: Dict[str, Any]) -> float:
+        """IP paid for a sent transaction, at the current gas price"""
+        
+        if not result.get("txHash") or result.get("gasUsed") is None:
+            return 0.0
+        gas_data = self.executor.get_gas_price()
+        if not gas_data.get("success"):
+            return 0.0
+        return int(result["gasUsed"]) * float(gas_data["gasPrice"]["gwei"]) * 1e-9
+    
     def _add_loop(self, user_address: str, assessment: RiskAssessment) -> Dict[str, Any]:
         """Add leverage loop when profitable and safe"""
         
@@ -108,7 +173,7 @@ class Rebalancer:
         # Execute unwind of 1 loop
         logger.info(f"Unwinding 1 loop (of {loops}) for {user_address}")
         
-        result = self.executor.execute_rebalance(
+        result = self._send(
             action="remove_loop",
             user_address=user_address,
             loops=1
@@ -150,7 +215,7 @@ class Rebalancer:
         # Execute full unwind (loops=0 means unwind all)
         logger.info(f"Executing emergency unwind for {user_address}")
         
-        result = self.executor.execute_rebalance(
+        result = self._send(
             action="emergency_unwind",
             user_address=user_address
         )
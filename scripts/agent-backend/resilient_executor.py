@@ -0,0 +1,314 @@
+import time
+import random
+import logging
+import threading
+from enum import Enum
+from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional, List, Tuple
+
+from executors import Executor, supports_keepers
+from profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+# Error responses containing these (lowercased) come from the RPC/transport,
+# not from the protocol, and count against the endpoint
+TRANSPORT_ERROR_MARKERS = (
+    "timeout", "timed out", "econnrefused", "econnreset", "connection",
+    "network", "socket hang up", "rate limit", "too many requests",
+    "502", "503", "504"
+)
+
+def is_transport_error(error: Optional[str]) -> bool:
+    error = (error or "").lower()
+    return any(marker in error for marker in TRANSPORT_ERROR_MARKERS)
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Opens after consecutive failures, lets one probe through after the reset timeout
+
+    While the probe is in flight every other call is refused; its outcome
+    closes the breaker or reopens it for another reset period.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether allow() would currently succeed, without claiming the probe"""
+
+        with self._lock:
+            if self.state == BreakerState.OPEN:
+                return time.time() - self.opened_at >= self.reset_seconds
+            if self.state == BreakerState.HALF_OPEN:
+                return not self.probing
+            return True
+
+    def allow(self) -> bool:
+        """Claim a call; in the half-open state only the first caller gets the probe"""
+
+        with self._lock:
+            if self.state == BreakerState.OPEN:
+                if time.time() - self.opened_at < self.reset_seconds:
+                    return False
+                self.state = BreakerState.HALF_OPEN
+                self.probing = False
+
+            if self.state == BreakerState.HALF_OPEN:
+                if self.probing:
+                    return False
+                self.probing = True
+            return True
+
+    def release(self):
+        """Give back a claimed call that was never made"""
+        with self._lock:
+            self.probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = BreakerState.CLOSED
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure, returns True if this opened the breaker"""
+
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == BreakerState.HALF_OPEN or self.failures >= self.failure_threshold:
+                opened = self.state != BreakerState.OPEN
+                self.state = BreakerState.OPEN
+                self.opened_at = time.time()
+                return opened
+            return False
+
+@dataclass
+class Endpoint:
+    url: str
+    executor: Executor
+    breaker: CircuitBreaker
+    latency: Optional[float] = None  # EWMA of successful call latency, seconds
+    calls: int = 0
+    failures: int = 0
+
+    def record_latency(self, seconds: float, alpha: float = 0.3):
+        self.latency = seconds if self.latency is None else alpha * seconds + (1 - alpha) * self.latency
+
+class CallFailed(Exception):
+    """A call failed on one endpoint (timeout, exception or RPC/connection error)"""
+
+    def __init__(self, message: str, pending: Optional[Future] = None):
+        super().__init__(message)
+        self.pending = pending  # Still-running call, on timeouts
+
+class ResilientExecutor:
+    """
+    Timeouts, jittered retries, per-endpoint circuit breakers and failover
+
+    Wraps one executor per RPC endpoint and exposes the same interface.
+    Reads are retried across endpoints, picking healthy ones weighted by
+    inverse latency. Transactions (execute_rebalance) are sent once, with a
+    longer timeout, since a retry could submit them twice. A transaction
+    that times out may still be sent: its response carries the running
+    call as "pending" for callers that must wait for it. When every
+    breaker is open, calls fail immediately instead of backing off.
+
+    Only endpoint faults (timeouts, exceptions, RPC/connection errors) trip
+    breakers and trigger retries. Other unsuccessful responses, such as an
+    unknown user or nothing to rebalance, go straight back to the caller.
+    """
+
+    def __init__(self, endpoints: List[Tuple[str, Executor]], config, rng: Optional[random.Random] = None):
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+
+        self.config = config
+        self.rng = rng or random.Random()
+        self.endpoints = [
+            Endpoint(
+                url=url,
+                executor=executor,
+                breaker=CircuitBreaker(config.breaker_failure_threshold, config.breaker_reset_seconds)
+            )
+            for url, executor in endpoints
+        ]
+        # Endpoint counters and selection are shared with rebalance worker threads
+        self._lock = threading.Lock()
+        # Timed-out calls keep their worker until they return, so leave headroom;
+        # each keeper account can also have a transaction in flight
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(4, 4 * len(self.endpoints)) + len(config.keeper_accounts),
+            thread_name_prefix="rpc-call"
+        )
+
+    # ------------------------------------------------------------------
+    # Executor interface
+
+    def query_position(self, user_address: str) -> Dict[str, Any]:
+        return self._read("query_position", user_address)
+
+    def get_gas_price(self) -> Dict[str, Any]:
+        return self._read("get_gas_price")
+
+    def check_system_status(self) -> Dict[str, Any]:
+        return self._read("check_system_status")
+
+    def calculate_correlation(self) -> Dict[str, Any]:
+        return self._read("calculate_correlation")
+
+    def get_signer_balance(self, address: str) -> Dict[str, Any]:
+        return self._read("get_signer_balance", address)
+
+    def supports_keepers(self) -> bool:
+        return all(supports_keepers(e.executor) for e in self.endpoints)
+
+    def begin_iteration(self, iteration: int):
+        """Forward the per-iteration hook to every backend that has one (not an RPC, no retries)"""
+        for endpoint in self.endpoints:
+            begin_iteration = getattr(endpoint.executor, "begin_iteration", None)
+            if begin_iteration is not None:
+                begin_iteration(iteration)
+
+    def execute_rebalance(self, action: str, user_address: str, loops: Optional[int] = None,
+                          signer: Optional[str] = None) -> Dict[str, Any]:
+        kwargs = {"action": action, "user_address": user_address}
+        if loops is not None:
+            kwargs["loops"] = loops
+        if signer is not None:
+            kwargs["signer"] = signer
+
+        endpoint = self._select()
+        if endpoint is None:
+            return {"success": False, "error": "All RPC endpoints unavailable (circuit open)"}
+
+        try:
+            return self._call(endpoint, "execute_rebalance", (), kwargs, self.config.tx_timeout_seconds)
+        except CallFailed as e:
+            result = {"success": False, "error": str(e), "endpoint": endpoint.url}
+            if e.pending is not None:
+                result["pending"] = e.pending
+            return result
+
+    # ------------------------------------------------------------------
+    # Internals
+
+    def _read(self, method: str, *args) -> Dict[str, Any]:
+        """Call a read method with retries and failover"""
+
+        last_error = "No RPC endpoint available"
+        tried = set()
+
+        for attempt in range(self.config.rpc_max_retries + 1):
+            endpoint = self._select(exclude=tried)
+            if endpoint is None:
+                # Every breaker is open: waiting here would only stall the sweep
+                break
+            if attempt:
+                self._backoff(attempt)
+
+            tried.add(endpoint.url)
+            if len(tried) == len(self.endpoints):
+                tried.clear()
+
+            try:
+                return self._call(endpoint, method, args, {}, self.config.rpc_call_timeout_seconds)
+            except CallFailed as e:
+                last_error = str(e)
+                logger.warning(f"{method} failed on {endpoint.url} (attempt {attempt + 1}): {e}")
+
+        return {"success": False, "error": last_error}
+
+    def _call(self, endpoint: Endpoint, method: str, args: tuple, kwargs: dict, timeout: float) -> Dict[str, Any]:
+        # A backend without the method is not an endpoint fault: no failure, no retry
+        fn = getattr(endpoint.executor, method, None)
+        if fn is None:
+            endpoint.breaker.release()
+            return {"success": False, "error": f"{method} is not supported by the backend at {endpoint.url}"}
+
+        with self._lock:
+            endpoint.calls += 1
+        start = time.perf_counter()
+
+        try:
+            future = self._pool.submit(profiled(fn), *args, **kwargs)
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._record_failure(endpoint)
+            raise CallFailed(f"Timed out after {timeout:.0f}s", pending=future)
+        except Exception as e:
+            self._record_failure(endpoint)
+            raise CallFailed(f"{type(e).__name__}: {e}")
+
+        if not result.get("success") and is_transport_error(result.get("error")):
+            self._record_failure(endpoint)
+            raise CallFailed(result.get("error"))
+
+        endpoint.breaker.record_success()
+        with self._lock:
+            endpoint.record_latency(time.perf_counter() - start)
+        return result
+
+    def _record_failure(self, endpoint: Endpoint):
+        with self._lock:
+            endpoint.failures += 1
+        if endpoint.breaker.record_failure():
+            logger.error(f"Circuit opened for {endpoint.url}")
+
+    def _select(self, exclude: Optional[set] = None) -> Optional[Endpoint]:
+        """
+        Pick an endpoint whose breaker allows calls, weighted by inverse latency
+
+        Only the picked endpoint's breaker is claimed (allow()), so a
+        half-open endpoint that is not picked keeps its single probe.
+        """
+
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.breaker.available()]
+            while candidates:
+                pool = candidates
+                if exclude:
+                    pool = [e for e in candidates if e.url not in exclude] or candidates
+
+                # Untried endpoints get the best known latency so they are explored
+                known = [e.latency for e in pool if e.latency is not None]
+                default = min(known) if known else 1.0
+                weights = [1.0 / max(e.latency if e.latency is not None else default, 1e-3) for e in pool]
+                endpoint = self.rng.choices(pool, weights=weights)[0]
+
+                if endpoint.breaker.allow():
+                    return endpoint
+                # Another thread took the probe in the meantime
+                candidates.remove(endpoint)
+            return None
+
+    def _backoff(self, attempt: int):
+        """Full-jitter exponential backoff"""
+        cap = min(self.config.retry_max_delay_seconds, self.config.retry_base_delay_seconds * 2 ** (attempt - 1))
+        time.sleep(self.rng.uniform(0, cap))
+
+    def endpoint_stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "url": e.url,
+                    "state": e.breaker.state.value,
+                    "latency": e.latency,
+                    "calls": e.calls,
+                    "failures": e.failures
+                }
+                for e in self.endpoints
+            ]
@@ -5,6 +5,14 @@ from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Fixed decision thresholds, shared by assess_position and the cache fingerprints
+DANGER_PRICE_DEVIATION = 0.05
+WARNING_PRICE_DEVIATION = 0.02
+DANGER_CORRELATION = 0.85
+EMERGENCY_DISTANCE = 0.1
+DANGER_DISTANCE = 0.3
+ADD_LOOP_HF_MARGIN = 0.3
+
 class RiskLevel(Enum):
     SAFE = "safe"
     WARNING = "warning"
@@ -134,7 +142,7 @@ class RiskAnalyzer:
             price_decoupling_risk = price_deviation
             
             # Critical: >5% deviation
-            if price_deviation > 0.05:
+            if price_deviation > DANGER_PRICE_DEVIATION:
                 if risk_level != RiskLevel.CRITICAL:
                     risk_level = RiskLevel.DANGER
                 if action == RebalanceAction.NONE or action == RebalanceAction.MONITOR:
@@ -142,13 +150,13 @@ class RiskAnalyzer:
                 reasons.append(f"DANGER: Price decoupling {price_deviation:.2%} (stIP/IP ratio: {price_ratio:.4f})")
             
             # Warning: >2% deviation
-            elif price_deviation > 0.02:
+            elif price_deviation > WARNING_PRICE_DEVIATION:
                 if risk_level == RiskLevel.SAFE:
                     risk_level = RiskLevel.WARNING
                 reasons.append(f"WARNING: Price deviation {price_deviation:.2%}")
             
             # Explain liquidation risk from decoupling
-            if price_deviation > 0.02:
+            if price_deviation > WARNING_PRICE_DEVIATION:
                 # If stIP depegs down, collateral value drops → liquidation risk
                 if price_ratio < 1.0:
                     reasons.append(f"⚠ stIP trading below IP by {(1-price_ratio)*100:.1f}% - collateral losing value!")
@@ -162,7 +170,7 @@ class RiskAnalyzer:
             correlation = float(correlation_data["correlation"]["estimate"])
             
             # Low correlation increases liquidation risk
-            if correlation < 0.85:
+            if correlation < DANGER_CORRELATION:
                 if risk_level in [RiskLevel.SAFE, RiskLevel.WARNING]:
                     risk_level = RiskLevel.DANGER
                 if action in [RebalanceAction.NONE, RebalanceAction.MONITOR]:
@@ -183,11 +191,11 @@ class RiskAnalyzer:
         
         # 5. Distance to Liquidation
         distance = float(risk["distanceToLiquidation"])
-        if distance < 0.1:  # Very close to liquidation
+        if distance < EMERGENCY_DISTANCE:  # Very close to liquidation
             risk_level = RiskLevel.CRITICAL
             action = RebalanceAction.EMERGENCY_UNWIND
             reasons.append(f"CRITICAL: Only {distance:.2%} from liquidation")
-        elif distance < 0.3:
+        elif distance < DANGER_DISTANCE:
             if risk_level == RiskLevel.SAFE:
                 risk_level = RiskLevel.DANGER
             if action == RebalanceAction.NONE:
@@ -205,7 +213,7 @@ class RiskAnalyzer:
             loops < strategy_max_loops and 
             next_loop_apy > current_net_apy and
             next_loop_apy > 0.01 and  # At least 1% net APY
-            health_factor > target_hf + 0.3):  # Good safety margin
+            health_factor > target_hf + ADD_LOOP_HF_MARGIN):  # Good safety margin
             
             action = RebalanceAction.ADD_LOOP
             reasons.append(f"Profitable to add loop: {next_loop_apy:.2%} net APY (current: {current_net_apy:.2%})")
@@ -218,6 +226,7 @@ class RiskAnalyzer:
         
         # 7. Gas Price Check
         gas_acceptable = True
+        deferred_action = None
         if gas_data and gas_data.get("success"):
             gas_gwei = float(gas_data["gasPrice"]["gwei"])
             gas_acceptable = gas_gwei < self.config.max_gas_price_gwei
@@ -227,6 +236,7 @@ class RiskAnalyzer:
                 # Don't execute rebalancing if gas is too high (unless critical)
                 if action in [RebalanceAction.REDUCE_LOOP, RebalanceAction.ADD_LOOP]:
                     reasons.append("Delaying rebalance due to high gas")
+                    deferred_action = action
                     action = RebalanceAction.MONITOR
         
         # Compile metrics
@@ -249,6 +259,8 @@ class RiskAnalyzer:
             "supply_apy": self.supply_apy,
             "borrow_apy": self.borrow_apy
         }
+        if deferred_action is not None:
+            metrics["deferred_action"] = deferred_action.value
         
         return RiskAssessment(
             risk_level=risk_level,
@@ -264,6 +276,74 @@ class RiskAnalyzer:
             metrics=metrics
         )
     
+    def position_fingerprint(self, position_data: Dict[str, Any]) -> tuple:
+        """
+        Bucketed per-position inputs to assess_position
+        
+        Two positions with the same fingerprint (under the same global
+        fingerprint) get the same assessment, so it can be reused. Besides
+        the buckets it records which side of every decision threshold each
+        input is on, so a bucket never hides a threshold crossing.
+        """
+        
+        if not position_data.get("success"):
+            return ("invalid",)
+        
+        position = position_data["position"]
+        risk = position_data["risk"]
+        
+        if not position["hasPosition"]:
+            return ("none",)
+        
+        health_factor = float(position["healthFactor"])
+        utilization_rate = float(risk["utilizationRate"])
+        distance = float(risk["distanceToLiquidation"])
+        strategy_params = self.config.get_strategy_params()
+        
+        return (
+            round(health_factor, 2),
+            health_factor < self.config.critical_health_factor,
+            health_factor < strategy_params["min_hf"],
+            health_factor < strategy_params["target_hf"],
+            health_factor > strategy_params["target_hf"] + ADD_LOOP_HF_MARGIN,
+            int(position["loops"]),
+            round(utilization_rate * 2) / 2,  # 0.5% buckets
+            utilization_rate / 100.0 > self.config.max_debt_utilization,
+            round(distance, 2),
+            distance < EMERGENCY_DISTANCE,
+            distance < DANGER_DISTANCE
+        )
+    
+    def global_fingerprint(
+        self,
+        correlation_data: Optional[Dict[str, Any]],
+        gas_data: Optional[Dict[str, Any]]
+    ) -> tuple:
+        """Bucketed inputs shared by every assessment in an iteration, with their threshold sides"""
+        
+        market = None
+        if correlation_data and correlation_data.get("success"):
+            prices = correlation_data["prices"]
+            ip_price = float(prices["wip"])
+            ratio = float(prices["stIP"]) / ip_price if ip_price > 0 else 1.0
+            deviation = abs(1.0 - ratio)
+            correlation = float(correlation_data["correlation"]["estimate"])
+            market = (
+                round(correlation * 200) / 200,  # 0.005 buckets
+                correlation < DANGER_CORRELATION,
+                correlation < self.config.correlation_threshold,
+                round(ratio, 3),
+                deviation > DANGER_PRICE_DEVIATION,
+                deviation > WARNING_PRICE_DEVIATION
+            )
+        
+        gas = None
+        if gas_data and gas_data.get("success"):
+            gas_gwei = float(gas_data["gasPrice"]["gwei"])
+            gas = (gas_gwei < self.config.max_gas_price_gwei, round(gas_gwei / 5) * 5)
+        
+        return (market, gas)
+    
     def _calculate_net_apy(self, loops: int) -> float:
         """
         Calculate net APY for a given number of loops
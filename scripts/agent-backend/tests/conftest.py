@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# Agent modules are flat scripts, import them the way main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from risk_analyzer import RiskAssessment, RiskLevel, RebalanceAction
+
+def _make_assessment(**overrides) -> RiskAssessment:
+    fields = {
+        "risk_level": RiskLevel.SAFE,
+        "recommended_action": RebalanceAction.NONE,
+        "health_factor": 1.8,
+        "distance_to_liquidation": 0.4,
+        "correlation": 0.95,
+        "price_decoupling_risk": 0.0,
+        "net_apy": 5.0,
+        "gas_acceptable": True,
+        "is_profitable": True,
+        "reasons": [],
+        "metrics": {"loops": 2, "utilization": 0.5},
+    }
+    fields.update(overrides)
+    return RiskAssessment(**fields)
+
+@pytest.fixture
+def make_assessment():
+    """Factory for a healthy RiskAssessment; override any field by keyword"""
+    return _make_assessment
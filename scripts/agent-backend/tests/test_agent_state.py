@@ -0,0 +1,43 @@
+import json
+
+from agent_state import AgentState
+from risk_analyzer import RebalanceAction
+
+USER = "0x" + "44" * 20
+
+def test_publish_assessment_converts_enums(make_assessment):
+    state = AgentState()
+    state.publish_assessment(USER, make_assessment(), "t0")
+
+    data = state.user(USER)["assessment"]
+    assert data["risk_level"] == "safe"
+    assert data["recommended_action"] == "none"
+    assert data["metrics"]["loops"] == 2
+    json.dumps(data)
+
+def test_unchanged_assessment_does_not_bump_version(make_assessment):
+    state = AgentState()
+    state.publish_assessment(USER, make_assessment(), "t0")
+    state.publish_assessment(USER, make_assessment(), "t1")
+    assert state.version == 1
+    assert state.user(USER)["updated_at"] == "t0"
+
+    state.publish_assessment(USER, make_assessment(health_factor=1.7), "t2")
+    state.publish_assessment(USER, make_assessment(health_factor=1.7, recommended_action=RebalanceAction.ADD_LOOP), "t3")
+    assert state.version == 3
+    assert state.snapshot(since=2)["users"][USER]["assessment"]["recommended_action"] == "add_loop"
+
+def test_since_older_than_rotated_alerts_gets_full_snapshot():
+    state = AgentState(max_alerts=3)
+    state.publish_alert({"n": 0})
+    since = state.version
+    for n in range(1, 4):
+        state.publish_alert({"n": n})
+    assert not state.snapshot(since)["full"]
+
+    # Alert 1 (after `since`) is rotated out now, a delta would silently miss it
+    state.publish_alert({"n": 4})
+    snapshot = state.snapshot(since)
+    assert snapshot["full"]
+    assert [a["n"] for a in snapshot["alerts"]] == [2, 3, 4]
+    assert not state.snapshot(state.version - 1)["full"]
@@ -0,0 +1,84 @@
+import json
+import socket
+import asyncio
+import urllib.request
+import urllib.error
+
+import pytest
+
+pytest.importorskip("aiohttp")
+import aiohttp
+
+from agent_state import AgentState
+from api_server import ApiServer
+
+USER = "0x" + "99" * 20
+
+def get(server, path, headers=None):
+    request = urllib.request.Request(f"http://127.0.0.1:{server.port}{path}", headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.headers, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, None
+
+@pytest.fixture
+def served(make_assessment):
+    state = AgentState()
+    state.publish_assessment(USER, make_assessment(), "t0")
+    server = ApiServer(state, "127.0.0.1", 0, push_interval_seconds=0.05)
+    server.start()
+    return state, server
+
+def test_etag_and_not_modified(served):
+    state, server = served
+    status, headers, body = get(server, "/api/state")
+    assert status == 200
+    assert body["full"] and USER in body["users"]
+    assert headers["ETag"] == f'"{state.version}"'
+    assert headers["Access-Control-Allow-Origin"] == "*"
+
+    status, _, _ = get(server, "/api/state", {"If-None-Match": headers["ETag"]})
+    assert status == 304
+
+    state.publish_alert({"type": "test"})
+    status, _, _ = get(server, "/api/state", {"If-None-Match": headers["ETag"]})
+    assert status == 200
+
+def test_since_returns_delta(served, make_assessment):
+    state, server = served
+    version = state.version
+    state.publish_alert({"type": "test"})
+
+    status, _, body = get(server, f"/api/state?since={version}")
+    assert not body["full"]
+    assert body["users"] == {}
+    assert body["alerts"] == [{"type": "test"}]
+
+    assert get(server, "/api/state?since=abc")[0] == 400
+    assert get(server, "/api/users/0xmissing")[0] == 404
+    assert get(server, f"/api/users/{USER}")[2]["assessment"]["risk_level"] == "safe"
+
+def test_websocket_pushes_deltas(served, make_assessment):
+    state, server = served
+
+    async def client():
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(f"http://127.0.0.1:{server.port}/ws") as ws:
+                first = json.loads((await ws.receive(timeout=5)).data)
+                state.publish_assessment(USER, make_assessment(health_factor=1.2), "t1")
+                pushed = json.loads((await ws.receive(timeout=5)).data)
+                return first, pushed
+
+    first, pushed = asyncio.run(client())
+    assert first["full"]
+    assert not pushed["full"]
+    assert pushed["users"][USER]["assessment"]["health_factor"] == 1.2
+
+def test_bind_failure_raises_instead_of_hanging():
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        server = ApiServer(AgentState(), "127.0.0.1", busy.getsockname()[1])
+        with pytest.raises(RuntimeError, match="failed to start"):
+            server.start(timeout_seconds=5)
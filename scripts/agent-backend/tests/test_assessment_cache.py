@@ -0,0 +1,104 @@
+import pytest
+
+from config import AgentConfig
+from fake_chain import FakeChain, FakeExecutor
+from monitoring_agent import MonitoringAgent
+from risk_analyzer import RebalanceAction
+
+USER = "0x" + "22" * 20
+
+@pytest.fixture
+def agent():
+    chain = FakeChain(seed=3, auto_create_users=False)
+    chain.add_user(USER, 1.0, loops=2)
+    agent = MonitoringAgent(AgentConfig(executor_backend="fake"), [USER], executor=FakeExecutor(chain))
+    agent.chain = chain
+
+    agent.assessments = 0
+    assess = agent.analyzer.assess_position
+
+    def counting(*args, **kwargs):
+        agent.assessments += 1
+        return assess(*args, **kwargs)
+
+    agent.analyzer.assess_position = counting
+    agent._rebalance = lambda user_address, assessment: None
+    return agent
+
+def monitor(agent):
+    correlation = agent.executor.calculate_correlation()
+    gas = agent.executor.get_gas_price()
+    agent._check_global_inputs(correlation, gas)
+    agent._monitor_user(USER, correlation, gas)
+
+def test_unchanged_position_reuses_assessment(agent):
+    monitor(agent)
+    version = agent.state.version
+    monitor(agent)
+    assert agent.assessments == 1
+    assert agent.state.version == version
+
+def test_position_change_invalidates(agent):
+    monitor(agent)
+    agent.chain.debt[0] *= 1.1
+    monitor(agent)
+    assert agent.assessments == 2
+
+def test_global_change_invalidates(agent):
+    monitor(agent)
+    agent.chain.set_market(gas_gwei=90.0)
+    monitor(agent)
+    assert agent.assessments == 2
+
+def test_crossing_critical_health_factor_inside_bucket_reassesses(agent):
+    critical = agent.config.critical_health_factor
+    correlation = agent.executor.calculate_correlation()
+    gas = agent.executor.get_gas_price()
+    agent._check_global_inputs(correlation, gas)
+
+    actions = []
+    for health_factor in (critical + 0.004, critical - 0.004):
+        position = agent.executor.query_position(USER)
+        position["position"]["healthFactor"] = f"{health_factor:.6f}"
+        agent.executor.query_position = lambda user_address, position=position: position
+        agent._monitor_user(USER, correlation, gas)
+        actions.append(agent.assessment_cache[USER][1].recommended_action)
+
+    assert actions == [RebalanceAction.REDUCE_LOOP, RebalanceAction.EMERGENCY_UNWIND]
+
+def test_iterations_between_correlation_checks_reuse_assessments(agent):
+    agent.config.correlation_check_interval = 3600
+    checks = []
+    calculate = agent.executor.calculate_correlation
+
+    def counting_correlation():
+        checks.append(1)
+        return calculate()
+
+    agent.executor.calculate_correlation = counting_correlation
+
+    agent._run_iteration(1)
+    fingerprint = agent.global_fingerprint
+    assert fingerprint[0] is not None
+
+    # No correlation check: the last result still feeds the fingerprint
+    agent._run_iteration(2)
+    assert len(checks) == 1
+    assert agent.global_fingerprint == fingerprint
+
+    # Next check with an unchanged market
+    agent.last_correlation_check = 0
+    agent._run_iteration(3)
+    assert len(checks) == 2
+    assert agent.global_fingerprint == fingerprint
+    assert agent.assessments == 1
+
+def test_failed_correlation_check_keeps_last_result(agent):
+    agent._run_iteration(1)
+    fingerprint = agent.global_fingerprint
+
+    agent.executor.calculate_correlation = lambda: {"success": False, "error": "boom"}
+    agent.last_correlation_check = 0
+    agent._run_iteration(2)
+    assert agent.global_fingerprint == fingerprint
+    assert agent.assessments == 1
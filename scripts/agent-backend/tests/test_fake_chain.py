@@ -0,0 +1,123 @@
+import time
+
+import pytest
+
+from config import AgentConfig
+from fake_chain import (
+    FakeChain, FakeExecutor, FlakyExecutor,
+    LOOP_LTV, LIQUIDATION_THRESHOLD, NO_DEBT_HEALTH_FACTOR, REBALANCE_GAS
+)
+from resilient_executor import ResilientExecutor
+
+def make_chain():
+    chain = FakeChain(seed=1)
+    chain.load_scenario(FakeChain.depeg_scenario(steps=4, drop=0.04, gas_gwei=30.0, gas_spike=40.0))
+    return chain
+
+def test_gas_reads_do_not_advance_scenario():
+    chain = make_chain()
+    executor = FakeExecutor(chain)
+    for _ in range(5):
+        assert float(executor.get_gas_price()["gasPrice"]["gwei"]) == 30.0
+    assert len(chain.scenario) == 4
+
+def test_scenario_steps_once_per_iteration_across_endpoints():
+    chain = make_chain()
+    executor = ResilientExecutor(
+        [("rpc1", FakeExecutor(chain)), ("rpc2", FlakyExecutor(FakeExecutor(chain), failure_rate=1.0))],
+        AgentConfig(executor_backend="fake")
+    )
+
+    executor.begin_iteration(1)
+    executor.begin_iteration(1)
+    assert chain.market.stip_price == 0.99
+
+    executor.begin_iteration(2)
+    assert chain.market.stip_price == 0.98
+    assert len(chain.scenario) == 2
+
+USER = "0x" + "aa" * 20
+
+def test_health_factor_and_liquidation_price_math():
+    chain = FakeChain(auto_create_users=False)
+    idx = chain.add_user(USER, 1.0, loops=2)
+
+    leverage = 1 + LOOP_LTV + LOOP_LTV ** 2
+    assert chain.collateral[idx] == pytest.approx(leverage)
+    assert chain.debt[idx] == pytest.approx(leverage - 1)
+    assert chain.health_factor(idx) == pytest.approx(leverage * LIQUIDATION_THRESHOLD / (leverage - 1))
+
+    # HF is exactly 1 at the liquidation price and scales linearly with the price
+    liquidation_price = chain.liquidation_price(idx)
+    chain.set_market(stip_price=liquidation_price)
+    assert chain.health_factor(idx) == pytest.approx(1.0)
+    chain.set_market(stip_price=liquidation_price * 1.5)
+    assert chain.health_factor(idx) == pytest.approx(1.5)
+
+    risk = chain.position(idx)["risk"]
+    assert float(risk["liquidationPrice"]) == pytest.approx(liquidation_price, abs=1e-6)
+    assert float(risk["distanceToLiquidation"]) == pytest.approx(1 / 3, abs=1e-6)
+
+def test_no_debt_position_is_never_liquidated():
+    chain = FakeChain(auto_create_users=False)
+    idx = chain.add_user(USER, 1.0, loops=0)
+    assert chain.health_factor(idx) == NO_DEBT_HEALTH_FACTOR
+    assert chain.liquidation_price(idx) == 0.0
+
+def test_remove_loop_raises_health_factor_and_charges_gas():
+    chain = FakeChain(auto_create_users=False)
+    idx = chain.add_user(USER, 1.0, loops=3)
+    executor = FakeExecutor(chain, signer_balance=1.0)
+    before = chain.health_factor(idx)
+
+    result = executor.execute_rebalance("remove_loop", USER, signer="k1")
+    assert result["success"]
+    assert result["updatedPosition"]["remainingLoops"] == 2
+    assert float(result["updatedPosition"]["healthFactor"]) > before
+
+    gas_cost = REBALANCE_GAS * chain.market.gas_gwei * 1e-9
+    assert float(executor.get_signer_balance("k1")["balance"]) == pytest.approx(1.0 - gas_cost, abs=1e-6)
+
+    # Back to the position the user would have had with two loops
+    expected = FakeChain(auto_create_users=False)
+    expected.add_user(USER, 1.0, loops=2)
+    assert chain.health_factor(idx) == pytest.approx(expected.health_factor(0))
+
+def test_emergency_unwind_and_rebalance_errors():
+    chain = FakeChain(auto_create_users=False)
+    idx = chain.add_user(USER, 1.0, loops=1)
+    executor = FakeExecutor(chain, signer_balance=0.0)
+
+    assert "Insufficient funds" in executor.execute_rebalance("emergency_unwind", USER, signer="k1")["error"]
+    assert "Unknown user" in executor.execute_rebalance("emergency_unwind", "0xmissing")["error"]
+
+    executor.fund_signer("k1", 1.0)
+    assert executor.execute_rebalance("emergency_unwind", USER, signer="k1")["success"]
+    assert chain.loops[idx] == 0 and chain.debt[idx] == 0.0
+    assert not executor.query_position(USER)["position"]["hasPosition"]
+    assert executor.execute_rebalance("remove_loop", USER, signer="k1")["error"] == "No loops to remove"
+
+def test_tens_of_thousands_of_users_stay_cheap():
+    chain = FakeChain(seed=7)
+    start = time.perf_counter()
+    users = chain.populate(50_000)
+    populated = time.perf_counter() - start
+
+    # Parallel typed arrays: a few dozen bytes of position state per user
+    per_user = sum(col.itemsize for col in (chain.initial, chain.collateral, chain.debt, chain.loops))
+    assert per_user <= 32
+    assert len(chain.debt) == 50_000
+
+    executor = FakeExecutor(chain)
+    start = time.perf_counter()
+    for user in users[::50]:
+        assert executor.query_position(user)["success"]
+    queried = time.perf_counter() - start
+
+    assert populated < 5.0
+    assert queried < 1.0
+
+    # Seeded: the same seed gives the same fleet
+    again = FakeChain(seed=7)
+    again.populate(50_000)
+    assert again.debt == chain.debt
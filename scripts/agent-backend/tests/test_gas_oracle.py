@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from config import AgentConfig
+from gas_oracle import GasOracle, DeferredActionQueue, Urgency
+from risk_analyzer import RiskLevel, RebalanceAction
+
+USER = "0x" + "11" * 20
+
+@pytest.fixture
+def deferred(make_assessment):
+    """Assessment whose action was downgraded to MONITOR because of high gas"""
+
+    def make(action: RebalanceAction, health_factor: float):
+        return make_assessment(
+            risk_level=RiskLevel.WARNING,
+            recommended_action=RebalanceAction.MONITOR,
+            health_factor=health_factor,
+            distance_to_liquidation=0.3,
+            gas_acceptable=False,
+            metrics={"deferred_action": action.value}
+        )
+    return make
+
+def gas(gwei: float):
+    return {"success": True, "gasPrice": {"gwei": gwei}}
+
+def test_forecast_tracks_window():
+    oracle = GasOracle(AgentConfig())
+    assert oracle.forecast() is None
+    assert not oracle.likely_to_drop()
+
+    for gwei in (200, 60, 60, 60, 60):
+        oracle.record(gas(gwei))
+    assert oracle.current == 60
+    assert oracle.likely_to_drop()
+
+    for gwei in (300, 300, 300):
+        oracle.record(gas(gwei))
+    assert not oracle.likely_to_drop()
+
+def test_add_loop_never_escalates_and_is_dropped_when_stale(deferred):
+    config = AgentConfig()
+    queue = DeferredActionQueue(config)
+    queue.defer(USER, deferred(RebalanceAction.ADD_LOOP, 1.4))
+
+    entry = queue.pending[USER]
+    entry.deferred_at = time.time() - config.max_deferral_seconds - 1
+    entry.assessment = deferred(RebalanceAction.ADD_LOOP, config.critical_health_factor)
+
+    assert queue.release(gas_acceptable=False, gas_expected_to_drop=False) == []
+    assert entry.urgency == Urgency.NORMAL
+    assert len(queue) == 0
+
+def test_reduce_loop_forced_after_max_deferral(deferred):
+    config = AgentConfig()
+    queue = DeferredActionQueue(config)
+    queue.defer(USER, deferred(RebalanceAction.REDUCE_LOOP, 1.45))
+    assert queue.release(gas_acceptable=False) == []
+
+    queue.pending[USER].deferred_at = time.time() - config.max_deferral_seconds - 1
+    released = queue.release(gas_acceptable=False)
+    assert [e.urgency for e in released] == [Urgency.FORCED]
+    assert released[0].as_executable().recommended_action == RebalanceAction.REDUCE_LOOP
+
+def test_elevated_waits_only_while_gas_expected_to_drop(deferred):
+    config = AgentConfig()
+    queue = DeferredActionQueue(config)
+    queue.defer(USER, deferred(RebalanceAction.REDUCE_LOOP, 1.45))
+    queue.pending[USER].deferred_at = time.time() - config.max_deferral_seconds / 2 - 1
+
+    assert queue.release(gas_acceptable=False, gas_expected_to_drop=True) == []
+    assert queue.pending[USER].urgency == Urgency.ELEVATED
+
+    released = queue.release(gas_acceptable=False, gas_expected_to_drop=False)
+    assert [e.user_address for e in released] == [USER]
+
+def test_acceptable_gas_releases_everything(deferred):
+    queue = DeferredActionQueue(AgentConfig())
+    queue.defer(USER, deferred(RebalanceAction.ADD_LOOP, 1.9))
+    assert len(queue.release(gas_acceptable=True)) == 1
+    assert len(queue) == 0
@@ -0,0 +1,186 @@
+import time
+
+import pytest
+
+from config import AgentConfig
+from executors import supports_keepers
+from fake_chain import FakeChain, FakeExecutor, FlakyExecutor
+from keeper_pool import KeeperPool
+from monitoring_agent import MonitoringAgent
+from rebalancer import Rebalancer
+from resilient_executor import ResilientExecutor
+from risk_analyzer import RebalanceAction, RiskLevel
+
+def test_acquire_least_busy_and_pins_user():
+    pool = KeeperPool(["k1", "k2"], min_balance=0.5)
+
+    first = pool.acquire("alice")
+    second = pool.acquire("bob")
+    assert first.address != second.address
+
+    # alice stays on her keeper even though it is now the busier one
+    again = pool.acquire("alice")
+    assert again is first
+    assert first.in_flight == 2
+    assert pool.is_busy("alice")
+
+    pool.release("alice", first)
+    assert pool.is_busy("alice")
+    pool.release("alice", first, sent=False)
+    assert not pool.is_busy("alice")
+    assert first.in_flight == 0
+    assert first.sent == 1
+
+    # Once released, alice can move to the idle keeper
+    pool.release("bob", second)
+    pool.acquire("carol")
+    assert pool.acquire("alice").in_flight == 1
+
+def test_low_balance_keepers_are_skipped():
+    pool = KeeperPool(["k1", "k2"], min_balance=0.5)
+    alert = pool.update_balance("k1", 0.1)
+    assert alert["type"] == "keeper_low_balance"
+    assert pool.update_balance("k1", 0.2) is None  # alert once
+
+    assert pool.acquire("alice").address == "k2"
+    assert pool.acquire("bob").address == "k2"
+
+    pool.update_balance("k2", 0.0)
+    assert pool.acquire("carol") is None
+
+    pool.update_balance("k1", 5.0)
+    assert pool.acquire("carol").address == "k1"
+
+def test_release_charges_gas_and_alerts_once_low():
+    pool = KeeperPool(["k1"], min_balance=0.5)
+    pool.update_balance("k1", 0.6)
+
+    keeper = pool.acquire("alice")
+    pool.release("alice", keeper, gas_spent=0.25)
+    assert keeper.balance == pytest.approx(0.35)
+    assert keeper.low_balance
+    assert pool.acquire("bob") is None
+
+    # Raised on a worker thread, handed out with the next refresh
+    alerts = pool.refresh_balances(FakeExecutor(FakeChain(), signer_balance=0.1))
+    assert [a["type"] for a in alerts] == ["keeper_low_balance"]
+
+def test_empty_pool_rejected():
+    with pytest.raises(ValueError):
+        KeeperPool([], min_balance=0.5)
+
+class LegacyExecutor:
+    """Backend without keeper support: no signer balances, no signer argument"""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def query_position(self, user_address):
+        return self.inner.query_position(user_address)
+
+    def get_gas_price(self):
+        return self.inner.get_gas_price()
+
+    def check_system_status(self):
+        return self.inner.check_system_status()
+
+    def calculate_correlation(self):
+        return self.inner.calculate_correlation()
+
+    def execute_rebalance(self, action, user_address, loops=None):
+        return self.inner.execute_rebalance(action, user_address, loops)
+
+def make_resilient(backend):
+    config = AgentConfig(executor_backend="fake", keeper_accounts=["k1", "k2"], breaker_failure_threshold=2)
+    return config, ResilientExecutor([("rpc1", backend)], config)
+
+def test_keeper_support_detection():
+    chain = FakeChain()
+    assert supports_keepers(FakeExecutor(chain))
+    assert supports_keepers(FlakyExecutor(FakeExecutor(chain)))
+    assert not supports_keepers(LegacyExecutor(FakeExecutor(chain)))
+    assert not make_resilient(LegacyExecutor(FakeExecutor(chain)))[1].supports_keepers()
+
+def test_missing_method_is_not_an_endpoint_failure():
+    _, executor = make_resilient(LegacyExecutor(FakeExecutor(FakeChain())))
+    for _ in range(3):
+        result = executor.get_signer_balance("k1")
+        assert not result["success"]
+        assert "not supported" in result["error"]
+
+    stats = executor.endpoint_stats()[0]
+    assert stats["state"] == "closed"
+    assert stats["failures"] == 0
+    assert executor.get_gas_price()["success"]
+
+def test_agent_disables_pool_for_unsupported_backend():
+    config, executor = make_resilient(LegacyExecutor(FakeExecutor(FakeChain())))
+    user = "0x" + "55" * 20
+    agent = MonitoringAgent(config, [user], executor=executor)
+    assert agent.keeper_pool is None
+    assert agent.rebalancer.keeper_pool is None
+
+    agent._run_iteration(1)
+    assert executor.endpoint_stats()[0]["state"] == "closed"
+
+def test_agent_keeps_pool_for_supported_backend():
+    config, executor = make_resilient(FakeExecutor(FakeChain()))
+    agent = MonitoringAgent(config, ["0x" + "55" * 20], executor=executor)
+    assert len(agent.keeper_pool) == 2
+
+USER = "0x" + "66" * 20
+
+def make_rebalancer(keepers, signer_balance=10.0):
+    chain = FakeChain(auto_create_users=False)
+    chain.add_user(USER, 1.0, loops=3)
+    executor = FakeExecutor(chain, signer_balance=signer_balance)
+    pool = KeeperPool(list(keepers), min_balance=0.1)
+    for address, balance in keepers.items():
+        executor.signer_balances[address] = balance
+        pool.update_balance(address, max(balance, 1.0))  # Refreshed before they were spent down
+    return executor, pool, Rebalancer(AgentConfig(executor_backend="fake"), executor, pool)
+
+def test_insufficient_funds_retries_from_another_keeper():
+    # k1 looks richer, so it is picked first
+    executor, pool, rebalancer = make_rebalancer({"k1": 0.0, "k2": 1.0})
+    pool.update_balance("k1", 5.0)
+
+    result = rebalancer._send(action="remove_loop", user_address=USER, loops=1)
+    assert result["success"]
+    assert result["from"] == "k2"
+    assert pool.keepers["k1"].low_balance
+    assert not pool.is_busy(USER)
+
+    # Gas charged to k2 (reported 1.0) matches what the chain took
+    assert pool.keepers["k2"].balance == pytest.approx(float(executor.get_signer_balance("k2")["balance"]), abs=1e-6)
+    assert pool.keepers["k2"].balance < 1.0
+
+def test_default_signer_once_every_keeper_is_unfunded():
+    _, pool, rebalancer = make_rebalancer({"k1": 0.0, "k2": 0.0})
+    result = rebalancer._send(action="remove_loop", user_address=USER, loops=1)
+    assert result["success"]
+    assert result["from"] not in ("k1", "k2")
+    assert all(k.low_balance for k in pool.keepers.values())
+
+def test_timed_out_transaction_keeps_user_pinned_until_it_returns(make_assessment):
+    chain = FakeChain(auto_create_users=False)
+    chain.add_user(USER, 1.0, loops=3)
+    config = AgentConfig(executor_backend="fake", keeper_accounts=["k1", "k2"], tx_timeout_seconds=0.05)
+    executor = ResilientExecutor([("rpc1", FakeExecutor(chain, tx_latency_seconds=0.3))], config)
+    agent = MonitoringAgent(config, [USER], executor=executor)
+
+    assessment = make_assessment(risk_level=RiskLevel.DANGER, recommended_action=RebalanceAction.REDUCE_LOOP)
+    agent._rebalance(USER, assessment)
+    time.sleep(0.15)
+
+    # Past the timeout, the transaction is still being sent
+    assert agent.keeper_pool.is_busy(USER)
+    assert USER in agent._in_flight
+    agent._rebalance(USER, assessment)  # Skipped, not sent twice
+
+    agent._rebalance_pool.shutdown(wait=True)
+    assert not agent.keeper_pool.is_busy(USER)
+    assert USER not in agent._in_flight
+    assert len(agent.alert_history) == 1
+    assert agent.alert_history[0]["result"]["success"]
+    assert chain.loops[0] == 2
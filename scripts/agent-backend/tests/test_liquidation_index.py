@@ -0,0 +1,51 @@
+from liquidation_index import LiquidationIndex
+
+def make_index():
+    index = LiquidationIndex()
+    index.update("a", 0.70)
+    index.update("b", 0.80)
+    index.update("c", 0.90)
+    index.update("d", 0.95)
+    return index
+
+def test_liquidated_at_most_exposed_first():
+    index = make_index()
+    assert index.liquidated_at(0.85) == ["d", "c"]
+    assert index.liquidated_at(0.90) == ["d", "c"]
+    assert index.liquidated_at(0.50) == ["d", "c", "b", "a"]
+    assert index.liquidated_at(1.00) == []
+
+def test_liquidated_by_drop():
+    index = make_index()
+    assert index.liquidated_by_drop(1.0, 0.04) == []
+    assert index.liquidated_by_drop(1.0, 0.06) == ["d"]
+    assert index.liquidated_by_drop(1.0, 0.25) == ["d", "c", "b"]
+
+def test_between_is_half_open():
+    index = make_index()
+    assert index.between(0.80, 0.95) == ["b", "c"]
+    assert index.between(0.0, 0.70) == []
+
+def test_move_and_remove():
+    index = make_index()
+    index.update("a", 0.99)
+    assert index.get("a") == 0.99
+    assert index.liquidated_at(0.97) == ["a"]
+    assert len(index) == 4
+
+    # Repaying all debt (no liquidation price) drops the user
+    index.update("b", 0.0)
+    assert "b" not in index
+    assert index.between(0.0, 1.0) == ["c", "d", "a"]
+
+    index.remove("c")
+    index.remove("missing")
+    assert len(index) == 2
+
+def test_update_from_position():
+    index = LiquidationIndex()
+    index.update_from_position("a", {"position": {"hasPosition": True}, "risk": {"liquidationPrice": "0.82"}})
+    assert index.get("a") == 0.82
+
+    index.update_from_position("a", {"position": {"hasPosition": False}})
+    assert "a" not in index
@@ -0,0 +1,38 @@
+from config import AgentConfig
+from fake_chain import FakeChain, FakeExecutor
+from monitoring_agent import MonitoringAgent
+
+SAFE = "0x" + "66" * 20
+EXPOSED = "0x" + "77" * 20
+
+def make_agent():
+    agent = MonitoringAgent(AgentConfig(executor_backend="fake"), [SAFE, EXPOSED], executor=FakeExecutor(FakeChain()))
+    agent.liquidation_index.update(SAFE, 0.5)
+    agent.liquidation_index.update(EXPOSED, 0.9)
+    return agent
+
+def correlation(estimate=0.95, stip_price=1.0):
+    return {
+        "success": True,
+        "correlation": {"estimate": f"{estimate:.6f}"},
+        "prices": {"stIP": f"{stip_price:.6f}", "wip": "1.000000"},
+        "risk": {"overallRiskLevel": "low"}
+    }
+
+def test_steady_market_keeps_order():
+    agent = make_agent()
+    assert agent._monitoring_order(correlation()) == [SAFE, EXPOSED]
+    assert agent._monitoring_order(correlation(estimate=0.94, stip_price=0.995)) == [SAFE, EXPOSED]
+
+def test_sharp_price_move_checks_exposed_first():
+    agent = make_agent()
+    agent._monitoring_order(correlation())
+    assert agent._monitoring_order(correlation(stip_price=0.97)) == [EXPOSED, SAFE]
+
+def test_sharp_correlation_drop_checks_exposed_first():
+    agent = make_agent()
+    agent._monitoring_order(correlation(estimate=0.95))
+    assert agent._monitoring_order(correlation(estimate=0.88)) == [EXPOSED, SAFE]
+
+    # A rise is not a shock
+    assert agent._monitoring_order(correlation(estimate=0.97)) == [SAFE, EXPOSED]
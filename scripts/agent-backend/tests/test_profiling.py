@@ -0,0 +1,48 @@
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import profiling
+from profiling import IterationProfiler, profiled
+
+def busy_worker_function():
+    return sum(i * i for i in range(20000))
+
+@pytest.mark.skipif(not profiling._PER_THREAD_PROFILES, reason="worker threads are not profiled on 3.12+")
+def test_worker_thread_work_is_merged(tmp_path):
+    profiler = IterationProfiler(str(tmp_path), every_n=1)
+    pool = ThreadPoolExecutor(max_workers=2)
+    # Start the workers before profiling, like the long-lived RPC pool
+    pool.submit(lambda: None).result()
+
+    with profiler.profile(1):
+        futures = [pool.submit(profiled(busy_worker_function)) for _ in range(3)]
+        for future in futures:
+            future.result()
+
+    stats = pstats.Stats(str(tmp_path / "iteration_000001.prof"))
+    calls = {func[2]: stat[1] for func, stat in stats.stats.items()}
+    assert calls["busy_worker_function"] == 3
+    assert "busy_worker_function" in (tmp_path / "hot_functions.txt").read_text()
+    pool.shutdown()
+
+def test_profiled_is_passthrough_outside_sampled_iterations(tmp_path):
+    profiler = IterationProfiler(str(tmp_path), every_n=2)
+    with profiler.profile(1):
+        assert profiled(busy_worker_function)() == busy_worker_function()
+    assert not list(tmp_path.glob("*.prof"))
+
+def test_worker_profiles_are_skipped_without_per_thread_profilers(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "_PER_THREAD_PROFILES", False)
+    profiler = IterationProfiler(str(tmp_path), every_n=1)
+    pool = ThreadPoolExecutor(max_workers=1)
+
+    with profiler.profile(1):
+        assert pool.submit(profiled(busy_worker_function)).result() == busy_worker_function()
+
+    stats = pstats.Stats(str(tmp_path / "iteration_000001.prof"))
+    calls = {func[2]: stat[1] for func, stat in stats.stats.items()}
+    # Only the monitoring thread's direct call is recorded
+    assert calls["busy_worker_function"] == 1
+    pool.shutdown()
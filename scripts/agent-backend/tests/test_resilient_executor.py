@@ -0,0 +1,139 @@
+import time
+import random
+
+import pytest
+
+from config import AgentConfig
+from fake_chain import FakeChain, FakeExecutor, FlakyExecutor
+from executors import create_executor
+from resilient_executor import CircuitBreaker, BreakerState, ResilientExecutor, is_transport_error
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.allow()
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == BreakerState.CLOSED
+
+def test_half_open_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    # Reset timeout elapsed: one probe goes through, the rest wait for its outcome
+    breaker.opened_at -= 61
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert not breaker.allow()
+    assert not breaker.available()
+
+    # A failed probe reopens immediately
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.allow()
+
+    breaker.opened_at -= 61
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.failures == 0
+
+def make_executor(*endpoints):
+    config = AgentConfig(
+        executor_backend="fake",
+        breaker_failure_threshold=2,
+        retry_base_delay_seconds=0.0,
+        retry_max_delay_seconds=0.0
+    )
+    return ResilientExecutor(list(endpoints), config, rng=random.Random(0))
+
+def test_semantic_failure_is_returned_without_tripping_breaker():
+    chain = FakeChain(auto_create_users=False)
+    executor = make_executor(("rpc1", FakeExecutor(chain)))
+
+    for _ in range(3):
+        result = executor.query_position("0xunknown")
+        assert not result["success"]
+        assert "Unknown user" in result["error"]
+
+    stats = executor.endpoint_stats()[0]
+    assert stats["state"] == "closed"
+    assert stats["calls"] == 3  # no retries
+    assert stats["failures"] == 0
+    assert executor.get_gas_price()["success"]
+
+def test_transport_failure_retries_and_fails_over():
+    chain = FakeChain()
+    executor = make_executor(
+        ("bad", FlakyExecutor(FakeExecutor(chain), failure_rate=1.0)),
+        ("good", FakeExecutor(chain))
+    )
+
+    for _ in range(5):
+        assert executor.get_gas_price()["success"]
+
+    stats = {s["url"]: s for s in executor.endpoint_stats()}
+    assert stats["good"]["failures"] == 0
+    assert stats["bad"]["state"] == "open"
+
+def test_rpc_error_response_counts_as_endpoint_failure():
+    assert is_transport_error("Error: connect ECONNREFUSED 127.0.0.1:8545")
+    assert is_transport_error("HTTP 503 Service Unavailable")
+    assert not is_transport_error("No loops to remove")
+    assert not is_transport_error(None)
+
+def test_released_probe_can_be_claimed_again():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    breaker.record_failure()
+    breaker.opened_at -= 61
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    assert not breaker.allow()
+
+def test_all_circuits_open_fails_fast():
+    chain = FakeChain()
+    executor = make_executor(("bad", FlakyExecutor(FakeExecutor(chain), failure_rate=1.0)))
+    executor.config.retry_base_delay_seconds = executor.config.retry_max_delay_seconds = 1.0
+    for endpoint in executor.endpoints:
+        for _ in range(2):
+            endpoint.breaker.record_failure()
+
+    start = time.perf_counter()
+    result = executor.query_position("0x" + "11" * 20)
+    assert time.perf_counter() - start < 0.1
+    assert result == {"success": False, "error": "No RPC endpoint available"}
+
+def test_select_only_claims_the_picked_endpoint():
+    chain = FakeChain()
+    executor = make_executor(("rpc1", FakeExecutor(chain)), ("rpc2", FakeExecutor(chain)))
+    for endpoint in executor.endpoints:
+        endpoint.breaker.record_failure()
+        endpoint.breaker.record_failure()
+        endpoint.breaker.opened_at -= 61
+
+    picked = executor._select()
+    other = next(e for e in executor.endpoints if e is not picked)
+    assert picked.breaker.state == BreakerState.HALF_OPEN
+    assert other.breaker.state == BreakerState.OPEN
+    assert other.breaker.available()
+
+    # The picked endpoint's probe is taken, so only the other one can be chosen
+    assert executor._select() is other
+    assert executor._select() is None
+
+def test_hardhat_backend_rejects_rpc_urls():
+    with pytest.raises(ValueError, match="RPC_URLS"):
+        create_executor(AgentConfig(executor_backend="hardhat", rpc_urls=["http://a", "http://b"]))
@@ -0,0 +1,83 @@
+import pytest
+
+from config import AgentConfig
+from risk_analyzer import RiskAnalyzer, RebalanceAction, EMERGENCY_DISTANCE, DANGER_DISTANCE, ADD_LOOP_HF_MARGIN
+
+def make_position(health_factor=2.5, utilization_rate=50.0, distance=0.5, loops=1):
+    return {
+        "success": True,
+        "position": {"hasPosition": True, "loops": loops, "healthFactor": f"{health_factor:.6f}"},
+        "unleash": {"totalCollateral": "1.0", "totalDebt": "0.4", "availableBorrows": "0.3"},
+        "risk": {
+            "utilizationRate": f"{utilization_rate:.4f}",
+            "distanceToLiquidation": f"{distance:.6f}",
+            "liquidationPrice": "0.5"
+        }
+    }
+
+def make_correlation(correlation=0.95, stip_price=1.0):
+    return {
+        "success": True,
+        "correlation": {"estimate": f"{correlation:.6f}"},
+        "prices": {"stIP": f"{stip_price:.6f}", "wip": "1.000000"},
+        "risk": {"overallRiskLevel": "low"}
+    }
+
+def straddle(threshold, offset=0.004):
+    """Two values either side of a threshold that fall in the same 0.01 bucket"""
+    low, high = threshold - offset, threshold + offset
+    assert round(low, 2) == round(high, 2)
+    return low, high
+
+@pytest.fixture
+def analyzer():
+    return RiskAnalyzer(AgentConfig())
+
+def hf_thresholds(config):
+    params = config.get_strategy_params()
+    return [
+        config.critical_health_factor,
+        params["min_hf"],
+        params["target_hf"],
+        params["target_hf"] + ADD_LOOP_HF_MARGIN
+    ]
+
+def test_health_factor_thresholds_split_fingerprint(analyzer):
+    for threshold in hf_thresholds(analyzer.config):
+        low, high = straddle(threshold)
+        below, above = make_position(health_factor=low), make_position(health_factor=high)
+        assert analyzer.position_fingerprint(below) != analyzer.position_fingerprint(above), threshold
+
+def test_distance_thresholds_split_fingerprint(analyzer):
+    for threshold in (EMERGENCY_DISTANCE, DANGER_DISTANCE):
+        low, high = straddle(threshold)
+        below, above = make_position(distance=low), make_position(distance=high)
+        assert analyzer.position_fingerprint(below) != analyzer.position_fingerprint(above), threshold
+
+        # The threshold changes the decision, so reusing a cached one would be wrong
+        assert (analyzer.assess_position(below).recommended_action !=
+                analyzer.assess_position(above).recommended_action)
+
+def test_utilization_threshold_splits_fingerprint(analyzer):
+    rate = analyzer.config.max_debt_utilization * 100
+    below, above = make_position(utilization_rate=rate - 0.1), make_position(utilization_rate=rate + 0.1)
+    assert analyzer.position_fingerprint(below) != analyzer.position_fingerprint(above)
+
+def test_critical_health_factor_changes_action(analyzer):
+    low, high = straddle(analyzer.config.critical_health_factor)
+    assert analyzer.assess_position(make_position(health_factor=low)).recommended_action == RebalanceAction.EMERGENCY_UNWIND
+    assert analyzer.assess_position(make_position(health_factor=high)).recommended_action == RebalanceAction.REDUCE_LOOP
+
+def test_same_bucket_same_sides_share_fingerprint(analyzer):
+    assert (analyzer.position_fingerprint(make_position(health_factor=2.501)) ==
+            analyzer.position_fingerprint(make_position(health_factor=2.503)))
+
+def test_market_thresholds_split_global_fingerprint(analyzer):
+    gas = {"success": True, "gasPrice": {"gwei": "30"}}
+    pairs = [
+        (make_correlation(correlation=0.8496), make_correlation(correlation=0.8504)),
+        (make_correlation(stip_price=0.9496), make_correlation(stip_price=0.9504)),
+        (make_correlation(stip_price=0.97996), make_correlation(stip_price=0.98004)),
+    ]
+    for below, above in pairs:
+        assert analyzer.global_fingerprint(below, gas) != analyzer.global_fingerprint(above, gas)
@@ -0,0 +1,13 @@
+import time
+
+import pytest
+
+from config import AgentConfig
+from monitoring_agent import MonitoringAgent, ExecutorUnavailable
+
+def test_executor_construction_failure_ends_run(monkeypatch):
+    agent = MonitoringAgent(AgentConfig(executor_backend="nonexistent"), ["0x" + "88" * 20])
+    monkeypatch.setattr(time, "sleep", lambda seconds: pytest.fail("run() should not back off and retry"))
+
+    with pytest.raises(ExecutorUnavailable, match="Unknown executor backend"):
+        agent.run()
@@ -0,0 +1,122 @@
+import time
+
+import numpy as np
+import pytest
+
+from timeseries_store import TimeSeriesStore, COLUMNS
+
+def make_rows(rows):
+    """rows: (ts, user, health_factor, risk_level, loops)"""
+    data = {name: np.zeros(len(rows), dtype=dtype) for name, dtype in COLUMNS.items()}
+    for i, (ts, user, hf, risk_level, loops) in enumerate(rows):
+        data["ts"][i] = ts
+        data["user"][i] = user
+        data["health_factor"][i] = hf
+        data["risk_level"][i] = risk_level
+        data["loops"][i] = loops
+    return data
+
+def test_downsample_aggregates_per_user_and_bucket():
+    data = make_rows([
+        (3700, 1, 1.6, 0, 3),
+        (10, 0, 2.0, 0, 3),
+        (3610, 0, 1.4, 2, 2),
+        (20, 0, 1.0, 1, 2),
+        (30, 1, 1.8, 0, 3),
+        (3650, 0, 1.6, 0, 1),
+    ])
+    out = TimeSeriesStore._downsample(data, 3600)
+
+    assert list(out["ts"]) == [0, 0, 3600, 3600]
+    rows = {(int(ts), int(user)): i for i, (ts, user) in enumerate(zip(out["ts"], out["user"]))}
+    assert set(rows) == {(0, 0), (0, 1), (3600, 0), (3600, 1)}
+
+    i = rows[(0, 0)]
+    assert np.isclose(out["health_factor"][i], 1.5)  # mean
+    assert out["risk_level"][i] == 1  # worst
+    assert out["loops"][i] == 2  # last by time
+
+    i = rows[(3600, 0)]
+    assert np.isclose(out["health_factor"][i], 1.5)
+    assert out["risk_level"][i] == 2
+    assert out["loops"][i] == 1
+
+    for name, dtype in COLUMNS.items():
+        assert out[name].dtype == dtype
+
+def test_retention_downsamples_each_bucket_once(tmp_path, make_assessment):
+    day = 86400
+    t0 = 1_700_000_000 // 3600 * 3600
+    store = TimeSeriesStore(str(tmp_path), flush_interval_seconds=1e9, raw_retention_seconds=day)
+
+    # Two segments, the second straddling the t0 + 1h bucket boundary
+    for ts, hf in [(t0 + 100, 1.0), (t0 + 1800, 2.0)]:
+        store.append("alice", make_assessment(health_factor=hf), ts=ts)
+    store.flush()
+    for ts, hf in [(t0 + 2000, 3.0), (t0 + 3000, 4.0), (t0 + 4000, 5.0), (t0 + 5000, 7.0)]:
+        store.append("alice", make_assessment(health_factor=hf), ts=ts)
+    store.flush()
+
+    # Raw cutoff falls inside the first bucket: nothing is complete yet
+    store.apply_retention(now=t0 + 2500 + day)
+    assert all(s["resolution"] == 0 for s in store.segments)
+
+    # Cutoff at t0 + 1h: the first bucket is downsampled from both segments
+    store.apply_retention(now=t0 + 3600 + 100 + day)
+    store.apply_retention(now=t0 + 7200 + 100 + day)
+
+    rows = store.scan("alice")
+    assert list(rows["ts"]) == [t0, t0 + 3600]
+    assert np.allclose(rows["health_factor"], [2.5, 6.0])
+    assert all(s["resolution"] == 3600 for s in store.segments)
+
+    # Reopening sees the same segments
+    assert len(TimeSeriesStore(str(tmp_path)).scan("alice")["ts"]) == 2
+
+def test_small_raw_segments_are_merged_per_day(tmp_path, make_assessment):
+    day = 86400
+    t0 = 1_700_000_000 // day * day
+    store = TimeSeriesStore(str(tmp_path), flush_interval_seconds=1e9, raw_retention_seconds=30 * day)
+
+    for ts in [t0 + 10, t0 + 20, t0 + 30, t0 + day + 10, t0 + day + 20]:
+        store.append("alice", make_assessment(health_factor=ts - t0), ts=ts)
+        store.flush()
+    assert len(store.segments) == 5
+
+    store.maintain(now=t0 + 2 * day)
+    assert len(store.segments) == 2
+    assert [s["rows"] for s in store.segments] == [3, 2]
+    assert list(store.scan("alice")["ts"]) == [t0 + 10, t0 + 20, t0 + 30, t0 + day + 10, t0 + day + 20]
+    assert len(TimeSeriesStore(str(tmp_path)).segments) == 2
+
+def test_downsampled_rows_merge_into_existing_segment(tmp_path, make_assessment):
+    day = 86400
+    t0 = 1_700_000_000 // (30 * day) * (30 * day)
+    store = TimeSeriesStore(str(tmp_path), flush_interval_seconds=1e9, raw_retention_seconds=day)
+
+    for hour in range(4):
+        store.append("alice", make_assessment(health_factor=1.0 + hour), ts=t0 + hour * 3600 + 60)
+        store.flush()
+        store.apply_retention(now=t0 + (hour + 1) * 3600 + 60 + day)
+
+    downsampled = [s for s in store.segments if s["resolution"] == 3600]
+    assert len(downsampled) == 1
+    assert downsampled[0]["rows"] == 4
+    assert np.allclose(store.scan("alice")["health_factor"], [1.0, 2.0, 3.0, 4.0])
+
+def test_latest_is_served_from_memory(tmp_path, make_assessment):
+    store = TimeSeriesStore(str(tmp_path), flush_interval_seconds=1e9)
+    now = time.time()
+    store.append("alice", make_assessment(health_factor=1.5), ts=now)
+    store.append("alice", make_assessment(health_factor=1.2), ts=now - 10)  # Late, older row
+    store.append("bob", make_assessment(health_factor=2.0), ts=now)
+    store.flush()
+
+    store.scan = None  # Any scan would fail
+    assert store.latest("alice")["health_factor"] == pytest.approx(1.5)
+    assert store.latest("bob")["user"] == store.user_ids["bob"]
+    assert store.latest("carol") is None
+
+    # After reopening the first lookup falls back to a scan
+    reopened = TimeSeriesStore(str(tmp_path))
+    assert reopened.latest("alice")["health_factor"] == pytest.approx(1.5)
@@ -0,0 +1,393 @@
+import os
+import json
+import time
+import shutil
+import logging
+from typing import Dict, Any, Optional, List
+
+import numpy as np
+
+from risk_analyzer import RiskAssessment, RiskLevel, RebalanceAction
+
+logger = logging.getLogger(__name__)
+
+# Fixed-width columns stored per tick and user
+COLUMNS = {
+    "ts": np.float64,
+    "user": np.uint32,
+    "health_factor": np.float32,
+    "distance_to_liquidation": np.float32,
+    "correlation": np.float32,
+    "price_decoupling_risk": np.float32,
+    "net_apy": np.float32,
+    "utilization": np.float32,
+    "loops": np.int8,
+    "risk_level": np.int8,
+    "action": np.int8,
+}
+
+# How columns are combined when downsampling
+MEAN_COLUMNS = ["health_factor", "distance_to_liquidation", "correlation",
+                "price_decoupling_risk", "net_apy", "utilization"]
+MAX_COLUMNS = ["risk_level", "action"]  # Keep the worst state in the bucket
+LAST_COLUMNS = ["loops"]
+
+RISK_LEVELS = list(RiskLevel)
+ACTIONS = list(RebalanceAction)
+
+class TimeSeriesStore:
+    """
+    Append-only columnar store of per-user risk metrics
+
+    Rows are buffered in memory and flushed as immutable segments: one
+    directory per segment with one .npy file per column, memory-mapped on
+    read. Segment metadata (time range, row count, resolution) lets scans
+    skip segments outside the requested window. Old raw segments are
+    downsampled into coarser buckets and eventually dropped.
+
+    Maintenance keeps the segment count bounded: small raw segments (one
+    per periodic flush) are merged per `compact_seconds` period, and
+    downsampled rows are merged into one segment per
+    `downsampled_segment_seconds` period.
+    """
+
+    def __init__(self, root: str, segment_rows: int = 65536, flush_interval_seconds: float = 300.0,
+                 raw_retention_seconds: float = 7 * 86400, downsample_seconds: float = 3600.0,
+                 max_retention_seconds: float = 365 * 86400, compact_seconds: float = 86400.0,
+                 downsampled_segment_seconds: float = 30 * 86400):
+        self.root = root
+        self.segment_rows = segment_rows
+        self.flush_interval_seconds = flush_interval_seconds
+        self.raw_retention_seconds = raw_retention_seconds
+        self.downsample_seconds = downsample_seconds
+        self.max_retention_seconds = max_retention_seconds
+        self.compact_seconds = compact_seconds
+        self.downsampled_segment_seconds = downsampled_segment_seconds
+
+        os.makedirs(root, exist_ok=True)
+
+        self._users_path = os.path.join(root, "users.json")
+        self.users: List[str] = []
+        if os.path.exists(self._users_path):
+            with open(self._users_path) as f:
+                self.users = json.load(f)
+        self.user_ids = {address: i for i, address in enumerate(self.users)}
+        self._users_dirty = False
+
+        self.segments = self._load_segments()
+        self._buffer = {name: np.empty(segment_rows, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._rows = 0
+        self._last_flush = time.time()
+        self._last_maintenance = 0.0
+        # user id -> most recent row, so latest() never scans
+        self._latest: Dict[int, Dict[str, Any]] = {}
+
+    # ------------------------------------------------------------------
+    # Writing
+
+    def append(self, user_address: str, assessment: RiskAssessment, ts: Optional[float] = None):
+        """Buffer one assessment; flushes when the buffer fills or the flush interval passes"""
+
+        i = self._rows
+        b = self._buffer
+        metrics = assessment.metrics
+
+        b["ts"][i] = time.time() if ts is None else ts
+        b["user"][i] = self._user_id(user_address)
+        b["health_factor"][i] = assessment.health_factor
+        b["distance_to_liquidation"][i] = assessment.distance_to_liquidation
+        b["correlation"][i] = assessment.correlation
+        b["price_decoupling_risk"][i] = assessment.price_decoupling_risk
+        b["net_apy"][i] = assessment.net_apy
+        b["utilization"][i] = metrics.get("utilization", np.nan)
+        b["loops"][i] = metrics.get("loops", -1)
+        b["risk_level"][i] = RISK_LEVELS.index(assessment.risk_level)
+        b["action"][i] = ACTIONS.index(assessment.recommended_action)
+        self._rows += 1
+
+        user_id = int(b["user"][i])
+        last = self._latest.get(user_id)
+        if last is None or b["ts"][i] >= last["ts"]:
+            self._latest[user_id] = {name: col[i].item() for name, col in b.items()}
+
+        if self._rows >= self.segment_rows or time.time() - self._last_flush >= self.flush_interval_seconds:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows as a new segment"""
+
+        self._last_flush = time.time()
+        if not self._rows:
+            return
+
+        # User ids must be on disk before any segment referencing them
+        if self._users_dirty:
+            self._write_json(self._users_path, self.users)
+            self._users_dirty = False
+
+        columns = {name: col[:self._rows] for name, col in self._buffer.items()}
+        order = np.argsort(columns["ts"], kind="stable")
+        self._write_segment({name: col[order] for name, col in columns.items()}, resolution=0.0)
+        self._rows = 0
+
+    def _user_id(self, user_address: str) -> int:
+        user_id = self.user_ids.get(user_address)
+        if user_id is None:
+            user_id = len(self.users)
+            self.users.append(user_address)
+            self.user_ids[user_address] = user_id
+            self._users_dirty = True
+        return user_id
+
+    def _write_segment(self, columns: Dict[str, np.ndarray], resolution: float):
+        ts = columns["ts"]
+        meta = {
+            "start": float(ts[0]),
+            "end": float(ts[-1]),
+            "rows": int(len(ts)),
+            "resolution": resolution,
+        }
+        name = f"seg_{int(meta['start'] * 1000):016d}_{int(meta['end'] * 1000):016d}_{int(resolution)}_{time.time_ns():x}"
+        path = os.path.join(self.root, name)
+
+        # Write to a temp directory and rename so readers never see partial segments
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for column, values in columns.items():
+            np.save(os.path.join(tmp, f"{column}.npy"), values.astype(COLUMNS[column], copy=False))
+        self._write_json(os.path.join(tmp, "meta.json"), meta)
+        os.replace(tmp, path)
+
+        meta["path"] = path
+        self.segments.append(meta)
+        self.segments.sort(key=lambda s: s["start"])
+
+    @staticmethod
+    def _write_json(path: str, data):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _read_segment(segment: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        return {name: np.load(os.path.join(segment["path"], f"{name}.npy")) for name in COLUMNS}
+
+    def _merge_segments(self, segments: List[Dict[str, Any]], resolution: float,
+                        extra: Optional[Dict[str, np.ndarray]] = None):
+        """Rewrite segments (plus any extra rows) as one time-sorted segment, then drop them"""
+
+        parts = [self._read_segment(s) for s in segments]
+        if extra is not None:
+            parts.append(extra)
+        data = {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+        order = np.argsort(data["ts"], kind="stable")
+        self._write_segment({name: col[order] for name, col in data.items()}, resolution)
+
+        # The merged segment is complete on disk before its sources go
+        for segment in segments:
+            self._drop_segment(segment)
+
+    def _load_segments(self) -> List[Dict[str, Any]]:
+        segments = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not name.startswith("seg_") or name.endswith(".tmp"):
+                continue
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            meta["path"] = path
+            segments.append(meta)
+        return sorted(segments, key=lambda s: s["start"])
+
+    # ------------------------------------------------------------------
+    # Reading
+
+    def scan(self, user_address: Optional[str] = None, start: Optional[float] = None,
+             end: Optional[float] = None, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Rows in [start, end) for one user (or all users), sorted by time
+
+        Includes rows still in the write buffer. Returns a dict of column
+        arrays; the "user" column holds ids, see self.users for addresses.
+        """
+
+        columns = list(columns or COLUMNS)
+        for required in ("ts", "user"):
+            if required not in columns:
+                columns.append(required)
+
+        user_id = None
+        if user_address is not None:
+            user_id = self.user_ids.get(user_address)
+            if user_id is None:
+                return {name: np.empty(0, dtype=COLUMNS[name]) for name in columns}
+
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+
+        parts = []
+        for segment in self.segments:
+            if segment["end"] < start or segment["start"] >= end:
+                continue
+            data = {name: np.load(os.path.join(segment["path"], f"{name}.npy"), mmap_mode="r") for name in columns}
+            parts.append(self._select(data, user_id, start, end))
+
+        if self._rows:
+            buffered = {name: self._buffer[name][:self._rows] for name in columns}
+            order = np.argsort(buffered["ts"], kind="stable")
+            parts.append(self._select({n: c[order] for n, c in buffered.items()}, user_id, start, end))
+
+        if not parts:
+            return {name: np.empty(0, dtype=COLUMNS[name]) for name in columns}
+
+        result = {name: np.concatenate([p[name] for p in parts]) for name in columns}
+        order = np.argsort(result["ts"], kind="stable")
+        return {name: col[order] for name, col in result.items()}
+
+    @staticmethod
+    def _select(data: Dict[str, np.ndarray], user_id: Optional[int], start: float, end: float) -> Dict[str, np.ndarray]:
+        ts = data["ts"]
+        lo = int(np.searchsorted(ts, start, side="left"))
+        hi = int(np.searchsorted(ts, end, side="left"))
+        if user_id is None:
+            return {name: np.array(col[lo:hi]) for name, col in data.items()}
+
+        mask = data["user"][lo:hi] == user_id
+        return {name: np.array(col[lo:hi][mask]) for name, col in data.items()}
+
+    def latest(self, user_address: str) -> Optional[Dict[str, Any]]:
+        """
+        Most recent row for a user as plain Python values
+
+        Served from memory; only the first call for a user not appended
+        since the store was opened scans the raw window.
+        """
+
+        user_id = self.user_ids.get(user_address)
+        if user_id is None:
+            return None
+
+        last = self._latest.get(user_id)
+        if last is None:
+            rows = self.scan(user_address, start=time.time() - self.raw_retention_seconds)
+            if not len(rows["ts"]):
+                return None
+            last = self._latest[user_id] = {name: col[-1].item() for name, col in rows.items()}
+        return dict(last)
+
+    # ------------------------------------------------------------------
+    # Retention
+
+    def maintain(self, now: Optional[float] = None, interval_seconds: float = 3600.0):
+        """Apply retention at most once per interval; cheap to call every iteration"""
+
+        now = time.time() if now is None else now
+        if now - self._last_maintenance < interval_seconds:
+            return
+        self._last_maintenance = now
+        self.apply_retention(now)
+        self.compact()
+
+    def compact(self):
+        """Merge small raw segments (below segment_rows) that start in the same compact_seconds period"""
+
+        groups: Dict[int, List[Dict[str, Any]]] = {}
+        for segment in self.segments:
+            if segment["resolution"] == 0 and segment["rows"] < self.segment_rows:
+                groups.setdefault(int(segment["start"] // self.compact_seconds), []).append(segment)
+
+        merged = 0
+        for group in groups.values():
+            if len(group) > 1:
+                self._merge_segments(group, resolution=0.0)
+                merged += len(group)
+
+        if merged:
+            logger.info(f"Compacted {merged} raw segment(s)")
+
+    def apply_retention(self, now: Optional[float] = None):
+        """
+        Downsample raw rows past raw retention and drop segments past max retention
+
+        The cutoff is aligned down to a bucket boundary and raw segments
+        straddling it are split, so every bucket is downsampled exactly once
+        from all of its rows, never partially across two passes.
+        """
+
+        now = time.time() if now is None else now
+        bucket = self.downsample_seconds
+        raw_cutoff = np.floor((now - self.raw_retention_seconds) / bucket) * bucket
+        max_cutoff = now - self.max_retention_seconds
+
+        for segment in [s for s in self.segments if s["end"] < max_cutoff]:
+            self._drop_segment(segment)
+
+        expired = [s for s in self.segments if s["resolution"] == 0 and s["start"] < raw_cutoff]
+        if not expired:
+            return
+
+        parts = [self._read_segment(s) for s in expired]
+        data = {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+        old = data["ts"] < raw_cutoff
+        self._append_downsampled(self._downsample({n: c[old] for n, c in data.items()}, bucket), bucket)
+
+        # Rows at or after the cutoff stay raw, in a new segment
+        if not old.all():
+            keep = np.flatnonzero(~old)
+            keep = keep[np.argsort(data["ts"][keep], kind="stable")]
+            self._write_segment({n: c[keep] for n, c in data.items()}, resolution=0.0)
+
+        for segment in expired:
+            self._drop_segment(segment)
+
+        logger.info(f"Downsampled {int(old.sum())} rows from {len(expired)} segment(s)")
+
+    def _append_downsampled(self, data: Dict[str, np.ndarray], bucket: float):
+        """Merge downsampled rows into the existing segment for each downsampled_segment_seconds period"""
+
+        period = self.downsampled_segment_seconds
+        key = (data["ts"] // period).astype(np.int64)
+        for k in np.unique(key):
+            rows = key == k
+            existing = [
+                s for s in self.segments
+                if s["resolution"] == bucket and int(s["start"] // period) == k
+            ]
+            self._merge_segments(existing, bucket, extra={n: c[rows] for n, c in data.items()})
+
+    @staticmethod
+    def _downsample(data: Dict[str, np.ndarray], bucket_seconds: float) -> Dict[str, np.ndarray]:
+        """Aggregate rows per (user, time bucket)"""
+
+        bucket = (data["ts"] // bucket_seconds).astype(np.int64)
+        order = np.lexsort((data["ts"], bucket, data["user"]))
+        user = data["user"][order]
+        bucket = bucket[order]
+
+        boundary = np.empty(len(order), dtype=bool)
+        boundary[0] = True
+        boundary[1:] = (user[1:] != user[:-1]) | (bucket[1:] != bucket[:-1])
+        starts = np.flatnonzero(boundary)
+        ends = np.append(starts[1:], len(order)) - 1
+        counts = np.diff(np.append(starts, len(order)))
+
+        out = {
+            "ts": bucket[starts].astype(np.float64) * bucket_seconds,
+            "user": user[starts],
+        }
+        for name in MEAN_COLUMNS:
+            values = data[name][order].astype(np.float64)
+            out[name] = np.add.reduceat(values, starts) / counts
+        for name in MAX_COLUMNS:
+            out[name] = np.maximum.reduceat(data[name][order], starts)
+        for name in LAST_COLUMNS:
+            out[name] = data[name][order][ends]
+
+        by_time = np.argsort(out["ts"], kind="stable")
+        return {name: out[name][by_time].astype(COLUMNS[name]) for name in COLUMNS}
+
+    def _drop_segment(self, segment: Dict[str, Any]):
+        shutil.rmtree(segment["path"], ignore_errors=True)
+        self.segments.remove(segment)